@@ -0,0 +1,166 @@
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Hashable, Optional
+import os
+import threading
+import time
+
+# Todas las cachés creadas, para exponer sus estadísticas
+_caches: list["TTLCache"] = []
+
+class TTLCache:
+    """
+    Caché en memoria acotada: expulsa por LRU cuando se llena y
+    descarta las entradas más antiguas que ttl segundos.
+    Es segura entre hilos (los endpoints síncronos corren en un threadpool).
+    """
+
+    def __init__(self, maxsize: int = 256, ttl: float = 60.0, name: str = "cache"):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        _caches.append(self)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.pop(key, None)
+        return default if entry is None else entry[1]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        return {
+            "name": self.name,
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+class FeedSnapshot:
+    """Feed ya serializado a JSON, listo para enviarse tal cual"""
+    __slots__ = ("body", "next_cursor", "etag", "last_modified", "encoded")
+
+    def __init__(
+        self,
+        body: bytes,
+        next_cursor: Optional[str] = None,
+        etag: Optional[str] = None,
+        last_modified: Optional[datetime] = None
+    ):
+        self.body = body
+        self.next_cursor = next_cursor
+        self.etag = etag
+        self.last_modified = last_modified
+        # Cuerpo comprimido por codificación (gzip, br), calculado al pedirse
+        self.encoded: dict[str, bytes] = {}
+
+# Versión global de las noticias: cualquier escritura la incrementa y
+# las claves de caché que incluyen la versión anterior dejan de usarse.
+# También se guarda cuándo cambió por última vez, para Last-Modified
+# (cubre los borrados, que no dejan ningún updated_at detrás). Hasta ver
+# un cambio es None: la hora de arranque difiere entre workers y avanza
+# con cada despliegue sin que cambien los datos.
+_news_version = 0
+_news_version_changed_at: Optional[datetime] = None
+_version_lock = threading.Lock()
+
+def get_news_version() -> int:
+    return _news_version
+
+def get_news_version_changed_at() -> Optional[datetime]:
+    return _news_version_changed_at
+
+def changed_recently(seconds: float) -> bool:
+    """Si este worker ha visto un cambio en las noticias hace menos de seconds"""
+    changed_at = _news_version_changed_at
+    return changed_at is not None and (datetime.now() - changed_at).total_seconds() < seconds
+
+def bump_news_version() -> int:
+    global _news_version, _news_version_changed_at
+    with _version_lock:
+        _news_version += 1
+        _news_version_changed_at = datetime.now()
+        return _news_version
+
+public_feed_cache = TTLCache(
+    maxsize=int(os.getenv("NEWS_CACHE_SIZE", "128")),
+    ttl=float(os.getenv("NEWS_CACHE_TTL", "300")),
+    name="public_feed",
+)
+
+class NewsItemSnapshot:
+    """Una noticia ya serializada, con lo necesario para permisos y ETag"""
+    __slots__ = ("body", "user_id", "etag", "updated_at")
+
+    def __init__(self, body: bytes, user_id, etag: Optional[str], updated_at: Optional[datetime]):
+        self.body = body
+        self.user_id = user_id
+        self.etag = etag
+        self.updated_at = updated_at
+
+# Caché por noticia (detalle y /news/batch). La clave incluye la versión de
+# la noticia: bump_news_item la incrementa al escribirla (en cualquier
+# worker, ver app.core.invalidation) y la entrada anterior deja de usarse.
+news_item_cache = TTLCache(
+    maxsize=int(os.getenv("NEWS_ITEM_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("NEWS_ITEM_CACHE_TTL", "300")),
+    name="news_items",
+)
+_news_item_versions: dict[int, int] = {}
+_news_items_generation = 0
+
+def news_item_key(news_id: int) -> tuple:
+    return (news_id, _news_items_generation, _news_item_versions.get(news_id, 0))
+
+def bump_news_item(news_id: Optional[int] = None) -> None:
+    """Invalida una noticia, o todas si news_id es None"""
+    global _news_items_generation
+    with _version_lock:
+        if news_id is None:
+            _news_items_generation += 1
+            _news_item_versions.clear()
+        else:
+            _news_item_versions[news_id] = _news_item_versions.get(news_id, 0) + 1
+
+def cache_stats() -> list[dict]:
+    return [cache.stats() for cache in _caches]
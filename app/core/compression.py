@@ -0,0 +1,241 @@
+"""
+Compresión de respuestas con gzip y, si el paquete está instalado, brotli.
+
+- CompressionMiddleware comprime al vuelo las respuestas de texto y JSON
+  a partir de COMPRESSION_MIN_SIZE bytes, según Accept-Encoding. Los
+  cuerpos grandes se comprimen en el threadpool, fuera del event loop.
+- Las respuestas que ya traen Content-Encoding pasan tal cual. Así el feed
+  público (encode_snapshot) y los estáticos (CompressedStaticFiles)
+  comprimen una sola vez y reutilizan los bytes en cada petición.
+"""
+from typing import Optional
+from fastapi.concurrency import run_in_threadpool
+from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import FileResponse, Response
+from app.core.cache import FeedSnapshot, TTLCache
+import gzip
+import os
+import zlib
+
+try:
+    import brotli
+except ImportError:  # Opcional: sin brotli solo se ofrece gzip
+    brotli = None
+
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+# A partir de este tamaño se comprime en el threadpool
+COMPRESSION_THREADPOOL_SIZE = 64 * 1024
+# Al vuelo prima la latencia; lo que se comprime una vez admite más nivel
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+CACHED_GZIP_LEVEL = 9
+CACHED_BROTLI_QUALITY = 9
+# Estáticos más grandes que esto se sirven sin comprimir (no se cachean)
+STATIC_MAX_SIZE = 4 * 1024 * 1024
+
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/json",
+    "application/x-ndjson",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+)
+
+def supported_encodings() -> tuple[str, ...]:
+    # En orden de preferencia cuando el cliente no distingue con q=
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+def choose_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """Mejor codificación aceptada por el cliente, o None (sin comprimir)"""
+    if not accept_encoding:
+        return None
+    qualities = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        qualities[name.strip().lower()] = quality
+
+    best, best_quality = None, 0.0
+    for encoding in supported_encodings():
+        quality = qualities.get(encoding, qualities.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+def is_compressible(content_type: Optional[str]) -> bool:
+    return bool(content_type) and content_type.startswith(COMPRESSIBLE_TYPES)
+
+def compress(data: bytes, encoding: str, cached: bool = False) -> bytes:
+    if encoding == "br":
+        return brotli.compress(data, quality=CACHED_BROTLI_QUALITY if cached else BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=CACHED_GZIP_LEVEL if cached else GZIP_LEVEL, mtime=0)
+
+def encode_snapshot(snapshot: FeedSnapshot, encoding: str) -> bytes:
+    """Cuerpo del snapshot comprimido; se calcula una vez por codificación"""
+    body = snapshot.encoded.get(encoding)
+    if body is None:
+        body = compress(snapshot.body, encoding, cached=True)
+        snapshot.encoded[encoding] = body
+    return body
+
+def weak_etag(etag: str) -> str:
+    """El cuerpo comprimido no es idéntico byte a byte: el ETag pasa a débil"""
+    return etag if etag.startswith("W/") else "W/" + etag
+
+def add_vary(headers: MutableHeaders) -> None:
+    vary = headers.get("vary")
+    if not vary:
+        headers["Vary"] = "Accept-Encoding"
+    elif "accept-encoding" not in vary.lower():
+        headers["Vary"] = f"{vary}, Accept-Encoding"
+
+class StreamCompressor:
+    """Compresión incremental para respuestas en streaming (export, import)"""
+
+    def __init__(self, encoding: str):
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=BROTLI_QUALITY)
+            self._zlib = None
+        else:
+            self._brotli = None
+            self._zlib = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        # Cada fragmento se vacía: el cliente lo recibe sin esperar al siguiente
+        if self._brotli is not None:
+            return self._brotli.process(data) + self._brotli.flush()
+        return self._zlib.compress(data) + self._zlib.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        if self._brotli is not None:
+            return self._brotli.finish()
+        return self._zlib.flush()
+
+async def _off_loop(function, data: bytes, *args):
+    if len(data) >= COMPRESSION_THREADPOOL_SIZE:
+        return await run_in_threadpool(function, data, *args)
+    return function(data, *args)
+
+class CompressionMiddleware:
+    """Middleware ASGI puro, como MetricsMiddleware"""
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_headers = Headers(scope=scope)
+        # Los rangos se refieren a los bytes sin comprimir
+        encoding = None
+        if scope["method"] != "HEAD" and "range" not in request_headers:
+            encoding = choose_encoding(request_headers.get("accept-encoding"))
+        start_message = None
+        compressor = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, compressor, passthrough
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(raw=message["headers"])
+                if "content-encoding" in headers or not is_compressible(headers.get("content-type")):
+                    passthrough = True
+                    await send(message)
+                    return
+                add_vary(headers)
+                if encoding is None or message["status"] in (204, 206, 304) or message["status"] < 200:
+                    passthrough = True
+                    await send(message)
+                    return
+                # Se retiene hasta ver el primer fragmento del cuerpo
+                start_message = message
+                return
+
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if start_message is not None:
+                headers = MutableHeaders(raw=start_message["headers"])
+                if not more_body:
+                    # Respuesta completa en un solo mensaje
+                    if len(body) < self.minimum_size:
+                        await send(start_message)
+                        await send(message)
+                        return
+                    body = await _off_loop(compress, body, encoding)
+                    headers["Content-Length"] = str(len(body))
+                else:
+                    compressor = StreamCompressor(encoding)
+                    del headers["Content-Length"]
+                headers["Content-Encoding"] = encoding
+                if "etag" in headers:
+                    headers["ETag"] = weak_etag(headers["etag"])
+                await send(start_message)
+                start_message = None
+                if compressor is None:
+                    await send({"type": "http.response.body", "body": body, "more_body": False})
+                    return
+
+            chunk = await _off_loop(compressor.compress, body) if body else b""
+            if not more_body:
+                chunk += compressor.finish()
+            await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+        await self.app(scope, receive, send_wrapper)
+
+class CompressedStaticFiles(StaticFiles):
+    """
+    StaticFiles que sirve los ficheros de texto comprimidos. Cada fichero
+    se comprime una vez por codificación (en el threadpool) y los bytes se
+    guardan en memoria; al cambiar el fichero (mtime/tamaño) la clave cambia.
+    """
+
+    async def get_response(self, path: str, scope) -> Response:
+        response = await super().get_response(path, scope)
+        if not isinstance(response, FileResponse) or response.status_code != 200:
+            return response
+        if not is_compressible(response.media_type):
+            return response
+        add_vary(response.headers)
+
+        request_headers = Headers(scope=scope)
+        encoding = None
+        if scope["method"] != "HEAD" and "range" not in request_headers:
+            encoding = choose_encoding(request_headers.get("accept-encoding"))
+        stat_result = response.stat_result
+        if encoding is None or stat_result is None:
+            return response
+        if not COMPRESSION_MIN_SIZE <= stat_result.st_size <= STATIC_MAX_SIZE:
+            return response
+
+        key = (response.path, stat_result.st_mtime_ns, stat_result.st_size, encoding)
+        body = static_cache.get(key)
+        if body is None:
+            body = await run_in_threadpool(_compress_file, response.path, encoding)
+            static_cache.set(key, body)
+
+        headers = {name: value for name, value in response.headers.items() if name != "content-length"}
+        headers["content-encoding"] = encoding
+        if "etag" in headers:
+            headers["etag"] = weak_etag(headers["etag"])
+        return Response(content=body, headers=headers)
+
+def _compress_file(path: str, encoding: str) -> bytes:
+    with open(path, "rb") as f:
+        return compress(f.read(), encoding, cached=True)
+
+static_cache = TTLCache(maxsize=64, ttl=24 * 3600, name="static_compressed")
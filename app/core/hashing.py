@@ -0,0 +1,170 @@
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures import BrokenExecutor
+from typing import Optional
+import multiprocessing
+import os
+import threading
+import time
+
+# Este módulo se importa también en los procesos del pool (spawn):
+# no debe importar nada pesado ni con efectos secundarios.
+import bcrypt
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_POOL_WORKERS = int(os.getenv("PASSWORD_POOL_WORKERS", str(min(4, os.cpu_count() or 1))))
+PASSWORD_POOL_MAX_QUEUE = int(os.getenv("PASSWORD_POOL_MAX_QUEUE", "4"))
+# Cada operación admitida bloquea un hilo del threadpool de AnyIO (40 por
+# defecto, compartido con todos los endpoints síncronos) mientras espera a
+# bcrypt: workers + max_queue se limita a este valor, muy por debajo de 40
+PASSWORD_POOL_MAX_THREADS = int(os.getenv("PASSWORD_POOL_MAX_THREADS", "8"))
+PASSWORD_POOL_TIMEOUT = float(os.getenv("PASSWORD_POOL_TIMEOUT", "10"))
+
+class PasswordPoolSaturated(Exception):
+    """No hay hueco en la cola del pool de contraseñas"""
+
+class PasswordPoolTimeout(Exception):
+    """La operación no terminó dentro de PASSWORD_POOL_TIMEOUT"""
+
+class PasswordPoolUnavailable(Exception):
+    """El pool no pudo ejecutar la operación (proceso caído, pool cerrado...)"""
+
+def _hash_password(password: str, rounds: int) -> tuple[str, float]:
+    started = time.perf_counter()
+    hashed = bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rounds=rounds)).decode("utf-8")
+    return hashed, time.perf_counter() - started
+
+def _check_password(plain_password: str, hashed_password: str) -> tuple[bool, float]:
+    started = time.perf_counter()
+    if hashed_password.startswith(("$2a$", "$2b$", "$2y$")):
+        valid = bcrypt.checkpw(plain_password.encode("utf-8"), hashed_password.encode("utf-8"))
+    else:
+        # Otros esquemas heredados: passlib solo se importa si hace falta
+        from passlib.context import CryptContext
+        valid = CryptContext(schemes=["bcrypt"], deprecated="auto").verify(plain_password, hashed_password)
+    return valid, time.perf_counter() - started
+
+class OperationStats:
+    """Tiempos de una operación: cómputo en el worker y espera en cola"""
+
+    def __init__(self):
+        self.count = 0
+        self.compute_seconds = 0.0
+        self.wait_seconds = 0.0
+        self.max_seconds = 0.0
+        self.last_seconds = 0.0
+
+    def record(self, compute: float, total: float) -> None:
+        self.count += 1
+        self.compute_seconds += compute
+        self.wait_seconds += max(0.0, total - compute)
+        self.max_seconds = max(self.max_seconds, total)
+        self.last_seconds = total
+
+    def as_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "avg_compute_ms": round(self.compute_seconds / self.count * 1000, 2) if self.count else 0.0,
+            "avg_wait_ms": round(self.wait_seconds / self.count * 1000, 2) if self.count else 0.0,
+            "max_ms": round(self.max_seconds * 1000, 2),
+            "last_ms": round(self.last_seconds * 1000, 2),
+        }
+
+class PasswordPool:
+    """
+    Pool de procesos dedicado a bcrypt.
+    La admisión está acotada: como máximo workers + max_queue operaciones
+    a la vez (y nunca más de max_threads); el resto se rechaza en el acto
+    con PasswordPoolSaturated. Las llamadas son bloqueantes y se hacen
+    desde el threadpool, nunca desde el event loop.
+    """
+
+    def __init__(self, workers: int, max_queue: int, timeout: float, max_threads: int = PASSWORD_POOL_MAX_THREADS):
+        self.workers = min(workers, max_threads)
+        self.max_queue = max(0, min(max_queue, max_threads - self.workers))
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(self.workers + self.max_queue)
+        self._lock = threading.Lock()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self.in_flight = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.stats = {"hash": OperationStats(), "verify": OperationStats()}
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._executor
+
+    def _release(self, future=None) -> None:
+        with self._lock:
+            self.in_flight -= 1
+        self._slots.release()
+
+    def run(self, operation: str, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise PasswordPoolSaturated()
+        started = time.perf_counter()
+        with self._lock:
+            self.in_flight += 1
+        try:
+            executor = self._get_executor()
+            future = executor.submit(fn, *args)
+        except (BrokenExecutor, RuntimeError, OSError) as e:
+            self._release()
+            raise PasswordPoolUnavailable(str(e)) from e
+        except BaseException:
+            self._release()
+            raise
+        # El hueco se libera cuando el proceso termina de verdad, no al rendirse
+        # el llamador: cancel() no detiene un bcrypt que ya está en marcha
+        future.add_done_callback(self._release)
+        try:
+            result, compute = future.result(timeout=self.timeout)
+        except BrokenExecutor as e:
+            # Un worker murió: descartar el pool para que el siguiente intento lo recree
+            with self._lock:
+                if self._executor is executor:
+                    self._executor = None
+            raise PasswordPoolUnavailable(str(e)) from e
+        except FutureTimeoutError:
+            future.cancel()
+            with self._lock:
+                self.timeouts += 1
+            raise PasswordPoolTimeout()
+        with self._lock:
+            self.stats[operation].record(compute, time.perf_counter() - started)
+        return result
+
+    def hash(self, password: str) -> str:
+        return self.run("hash", _hash_password, password, BCRYPT_ROUNDS)
+
+    def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return self.run("verify", _check_password, plain_password, hashed_password)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "max_threads": self.workers + self.max_queue,
+                "timeout": self.timeout,
+                "bcrypt_rounds": BCRYPT_ROUNDS,
+                "in_flight": self.in_flight,
+                "rejected": self.rejected,
+                "timeouts": self.timeouts,
+                "operations": {name: stats.as_dict() for name, stats in self.stats.items()},
+            }
+
+password_pool = PasswordPool(PASSWORD_POOL_WORKERS, PASSWORD_POOL_MAX_QUEUE, PASSWORD_POOL_TIMEOUT)
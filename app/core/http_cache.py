@@ -0,0 +1,62 @@
+from fastapi import Request, Response
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+import hashlib
+
+def make_etag(body: bytes) -> str:
+    """ETag fuerte a partir del contenido exacto de la respuesta"""
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+def to_utc(value: datetime) -> datetime:
+    # Las fechas del modelo se guardan con datetime.now() (hora local, sin zona)
+    if value.tzinfo is None:
+        value = value.astimezone()
+    return value.astimezone(timezone.utc).replace(microsecond=0)
+
+def http_date(value: datetime) -> str:
+    return format_datetime(to_utc(value), usegmt=True)
+
+def _etag_matches(header: str, etag: str) -> bool:
+    if header.strip() == "*":
+        return True
+    # Comparación débil (RFC 9110 §13.1.2): se ignora el prefijo W/
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+def is_not_modified(request: Request, etag: Optional[str], last_modified: Optional[datetime]) -> bool:
+    """
+    Evalúa If-None-Match / If-Modified-Since.
+    Si llega If-None-Match, If-Modified-Since se ignora (RFC 9110 §13.2.2).
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return etag is not None and _etag_matches(if_none_match, etag)
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        return to_utc(last_modified) <= since
+    return False
+
+def validator_headers(etag: Optional[str], last_modified: Optional[datetime], cache_control: str) -> dict:
+    headers = {"Cache-Control": cache_control}
+    if etag:
+        headers["ETag"] = etag
+    if last_modified:
+        headers["Last-Modified"] = http_date(last_modified)
+    return headers
+
+def not_modified(headers: dict) -> Response:
+    return Response(status_code=304, headers=headers)
@@ -0,0 +1,79 @@
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+import asyncio
+import io
+import logging
+import multiprocessing
+import os
+import threading
+
+# Este módulo se importa también en los procesos del pool (spawn):
+# Pillow es la única dependencia pesada y solo se usa dentro del worker.
+
+logger = logging.getLogger(__name__)
+
+IMAGE_VARIANT_WIDTHS = tuple(
+    int(width) for width in os.getenv("IMAGE_VARIANT_WIDTHS", "320,640,1280").split(",")
+)
+IMAGE_VARIANT_FORMATS = (("webp", "WEBP", "image/webp"), ("jpg", "JPEG", "image/jpeg"))
+IMAGE_POOL_WORKERS = int(os.getenv("IMAGE_POOL_WORKERS", "1"))
+IMAGE_VARIANTS_JOB = "image.variants"
+
+def render_variants(data: bytes, widths: tuple = IMAGE_VARIANT_WIDTHS) -> list[tuple[int, str, str, bytes]]:
+    """
+    Decodifica la imagen una sola vez y genera cada ancho en WebP y JPEG.
+    No se amplía: los anchos mayores que el original se omiten (si todos lo
+    son, se genera uno al ancho original). Los metadatos (EXIF, ICC) no se
+    copian a las variantes.
+    Devuelve tuplas (ancho, extensión, content-type, bytes).
+    """
+    from PIL import Image, ImageOps
+
+    with Image.open(io.BytesIO(data)) as source:
+        source.seek(0)  # GIF animado: primer fotograma
+        image = ImageOps.exif_transpose(source).convert("RGB")
+
+    targets = [width for width in sorted(set(widths)) if width <= image.width] or [image.width]
+    variants = []
+    for width in targets:
+        height = max(1, round(image.height * width / image.width))
+        resized = image if width == image.width else image.resize((width, height), Image.LANCZOS)
+        for extension, pil_format, content_type in IMAGE_VARIANT_FORMATS:
+            buffer = io.BytesIO()
+            if pil_format == "WEBP":
+                resized.save(buffer, pil_format, quality=80, method=4)
+            else:
+                resized.save(buffer, pil_format, quality=82, optimize=True, progressive=True)
+            variants.append((width, extension, content_type, buffer.getvalue()))
+    return variants
+
+def variant_path(original_path: str, width: int, extension: str) -> str:
+    """news/<uuid>.png -> news/variants/<uuid>/w640.webp"""
+    directory, file_name = os.path.split(original_path)
+    stem = os.path.splitext(file_name)[0]
+    return f"{directory}/variants/{stem}/w{width}.{extension}"
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=IMAGE_POOL_WORKERS,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _executor
+
+async def render_variants_async(data: bytes) -> list[tuple[int, str, str, bytes]]:
+    """Ejecuta render_variants en el pool de procesos sin bloquear el event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_executor(), render_variants, data)
+
+def shutdown_image_pool() -> None:
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
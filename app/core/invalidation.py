@@ -0,0 +1,274 @@
+"""
+Invalidación de cachés entre workers.
+
+Cada worker de uvicorn tiene sus propias cachés en memoria (feed público,
+principals). Las escrituras publican un evento (entity, entity_id, version)
+dentro de su misma transacción:
+- en PostgreSQL con pg_notify, que se entrega al hacer commit; cada worker
+  escucha el canal con LISTEN desde un hilo propio
+- en SQLite (u otros) como fila de cache_events, que cada worker sondea
+  cada INVALIDATION_POLL_INTERVAL segundos
+- con DB_TRANSACTION_POOLER también por cache_events: un pooler en modo
+  transacción (PgBouncer, Supavisor :6543) no mantiene la sesión y los
+  LISTEN se pierden sin error
+
+En el worker que escribe el evento se aplica justo después del commit, sin
+esperar al bus. No se detectan pérdidas por huecos en version (los dejan
+también los rollbacks y los commits concurrentes): con LISTEN PostgreSQL
+entrega todo lo confirmado mientras la conexión sigue viva y al
+(re)conectar se invalida todo. En modo sondeo los ids de cache_events NO
+llegan en orden de commit (en PostgreSQL salen de una secuencia y dos
+transacciones pueden confirmarse al revés), así que además de los ids
+nuevos se releen los eventos de los últimos INVALIDATION_REORDER_WINDOW
+segundos y se descartan los ya aplicados; solo se invalida todo si el
+sondeo se interrumpe más que la retención.
+El retraso de propagación se mide en cache_invalidation_delay_seconds.
+"""
+from typing import Callable, Optional
+from sqlalchemy import event, func, or_, text
+from sqlalchemy.orm import Session
+from app.database import DB_TRANSACTION_POOLER, SessionLocal, engine
+from app.models.cache_event import CacheEvent
+from app.core.cache import bump_news_item, bump_news_version
+from app.core.metrics import CACHE_INVALIDATION_DELAY
+import itertools
+import logging
+import os
+import select
+import threading
+import time
+import uuid
+import orjson
+
+logger = logging.getLogger(__name__)
+
+INVALIDATION_CHANNEL = "cache_invalidation"
+INVALIDATION_POLL_INTERVAL = float(os.getenv("INVALIDATION_POLL_INTERVAL", "1"))
+# Los eventos de cache_events más antiguos que esto se borran
+INVALIDATION_RETENTION = float(os.getenv("INVALIDATION_RETENTION", "3600"))
+# En modo sondeo se releen los eventos publicados en estos últimos segundos:
+# debe superar la duración de cualquier transacción que publique eventos
+INVALIDATION_REORDER_WINDOW = float(os.getenv("INVALIDATION_REORDER_WINDOW", "60"))
+
+NEWS = "news"
+USER = "user"
+ALL = "*"
+
+# Identifica a este proceso: sus propios eventos ya se aplicaron localmente
+WORKER_ID = uuid.uuid4().hex
+_versions = itertools.count(1)
+
+InvalidationHandler = Callable[[Optional[str]], None]
+_handlers: dict[str, list[InvalidationHandler]] = {}
+
+def invalidation_handler(entity: str):
+    """
+    Registra qué hacer en este worker cuando cambia entity. El handler
+    recibe el id afectado, o None si hay que invalidar todo lo de entity.
+    """
+    def decorator(function: InvalidationHandler) -> InvalidationHandler:
+        _handlers.setdefault(entity, []).append(function)
+        return function
+    return decorator
+
+def apply_event(entity: str, entity_id: Optional[str] = None) -> None:
+    entities = list(_handlers) if entity == ALL else [entity]
+    for name in entities:
+        for handler in _handlers.get(name, []):
+            try:
+                handler(None if entity == ALL else entity_id)
+            except Exception as e:
+                logger.error(f"Error aplicando la invalidación {name}: {str(e)}", exc_info=True)
+
+def uses_notify() -> bool:
+    return engine.dialect.name == "postgresql" and not DB_TRANSACTION_POOLER
+
+def publish(db: Session, entity: str, entity_id=None) -> None:
+    """
+    Publica un cambio dentro de la transacción de db: los demás workers
+    solo lo ven si hace commit, y este worker lo aplica tras el commit.
+    """
+    entity_id = None if entity_id is None else str(entity_id)
+    payload = {
+        "entity": entity,
+        "entity_id": entity_id,
+        "origin": WORKER_ID,
+        "version": next(_versions),
+        "published_at": time.time(),
+    }
+    if uses_notify():
+        db.execute(
+            text("SELECT pg_notify(:channel, :payload)"),
+            {"channel": INVALIDATION_CHANNEL, "payload": orjson.dumps(payload).decode()}
+        )
+    else:
+        db.add(CacheEvent(**payload))
+    db.info.setdefault("invalidations", []).append((entity, entity_id))
+
+@event.listens_for(SessionLocal, "after_commit")
+def _apply_committed(session):
+    for entity, entity_id in session.info.pop("invalidations", []):
+        apply_event(entity, entity_id)
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _discard_rolled_back(session):
+    session.info.pop("invalidations", None)
+
+class InvalidationListener:
+    """Hilo que recibe los eventos de los demás workers; uno por proceso"""
+
+    def __init__(self, poll_interval: float = INVALIDATION_POLL_INTERVAL):
+        self.poll_interval = poll_interval
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.last_event_id: Optional[int] = None
+        self.applied = 0
+        self.full_invalidations = 0
+        self.last_delay: Optional[float] = None
+        self._last_prune = 0.0
+        self._last_poll: Optional[float] = None
+        # Ids ya aplicados dentro de la ventana de reordenación (id -> published_at)
+        self._seen: dict[int, float] = {}
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="cache-invalidation", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def stats(self) -> dict:
+        return {
+            "worker_id": WORKER_ID,
+            "transport": "notify" if uses_notify() else "poll",
+            "running": self._thread is not None and self._thread.is_alive(),
+            "applied": self.applied,
+            "full_invalidations": self.full_invalidations,
+            "last_delay_seconds": self.last_delay,
+        }
+
+    def invalidate_all(self, reason: str) -> None:
+        logger.warning(f"Invalidando todas las cachés: {reason}")
+        self.full_invalidations += 1
+        apply_event(ALL)
+
+    def handle(self, payload: dict) -> None:
+        if payload["origin"] == WORKER_ID:
+            return
+        apply_event(payload["entity"], payload["entity_id"])
+        delay = max(0.0, time.time() - payload["published_at"])
+        CACHE_INVALIDATION_DELAY.observe(payload["entity"], value=delay)
+        self.applied += 1
+        self.last_delay = delay
+
+    def poll_once(self) -> int:
+        """Aplica los eventos nuevos de cache_events (modo sondeo)"""
+        db = SessionLocal()
+        try:
+            window_start = time.time() - INVALIDATION_REORDER_WINDOW
+            if self.last_event_id is None:
+                # Al arrancar las cachés están vacías: solo importa lo que se confirme después
+                self.last_event_id = db.query(func.max(CacheEvent.id)).scalar() or 0
+                self._seen = dict(
+                    db.query(CacheEvent.id, CacheEvent.published_at)
+                    .filter(CacheEvent.published_at > window_start)
+                    .all()
+                )
+                self._last_poll = time.monotonic()
+                return 0
+            if time.monotonic() - self._last_poll > INVALIDATION_RETENTION:
+                # Los eventos pendientes pueden haberse borrado ya
+                self.invalidate_all("sondeo interrumpido más que la retención")
+            # Los ids no llegan en orden de commit: se releen también los de la ventana
+            events = db.query(
+                CacheEvent.id,
+                CacheEvent.entity,
+                CacheEvent.entity_id,
+                CacheEvent.origin,
+                CacheEvent.version,
+                CacheEvent.published_at,
+            ).filter(or_(CacheEvent.id > self.last_event_id, CacheEvent.published_at > window_start))\
+                .order_by(CacheEvent.id)\
+                .all()
+            if time.monotonic() - self._last_prune > INVALIDATION_RETENTION / 4:
+                self._last_prune = time.monotonic()
+                db.query(CacheEvent)\
+                    .filter(CacheEvent.published_at < time.time() - INVALIDATION_RETENTION)\
+                    .delete(synchronize_session=False)
+                db.commit()
+            self._last_poll = time.monotonic()
+        finally:
+            db.close()
+        new_events = [cache_event for cache_event in events if cache_event.id not in self._seen]
+        for cache_event in new_events:
+            self._seen[cache_event.id] = cache_event.published_at
+            self.last_event_id = max(self.last_event_id, cache_event.id)
+            self.handle(cache_event._asdict())
+        self._seen = {
+            event_id: published_at for event_id, published_at in self._seen.items()
+            if published_at > window_start
+        }
+        return len(new_events)
+
+    def _listen(self) -> None:
+        """LISTEN en una conexión propia, fuera del pool"""
+        connection = engine.raw_connection()
+        connection.detach()
+        dbapi_connection = connection.dbapi_connection
+        try:
+            dbapi_connection.autocommit = True
+            dbapi_connection.cursor().execute(f"LISTEN {INVALIDATION_CHANNEL}")
+            # Mientras no se escuchaba pudo perderse cualquier evento
+            self.invalidate_all("conexión LISTEN (re)establecida")
+            while not self._stop.is_set():
+                for notification in self._wait_notifications(dbapi_connection):
+                    self.handle(orjson.loads(notification.payload))
+        finally:
+            connection.close()
+
+    def _wait_notifications(self, dbapi_connection) -> list:
+        if callable(getattr(dbapi_connection, "notifies", None)):
+            # psycopg 3
+            return list(dbapi_connection.notifies(timeout=self.poll_interval))
+        # psycopg2
+        if select.select([dbapi_connection], [], [], self.poll_interval) == ([], [], []):
+            return []
+        dbapi_connection.poll()
+        notifications = list(dbapi_connection.notifies)
+        dbapi_connection.notifies.clear()
+        return notifications
+
+    def _run(self) -> None:
+        failures = 0
+        while not self._stop.is_set():
+            try:
+                if uses_notify():
+                    self._listen()
+                else:
+                    if self.poll_once():
+                        continue
+                    self._stop.wait(self.poll_interval)
+                failures = 0
+            except Exception as e:
+                failures += 1
+                logger.error(f"Error en el bus de invalidación: {str(e)}")
+                self._stop.wait(min(30.0, 2 ** failures))
+
+invalidation_listener = InvalidationListener()
+
+@invalidation_handler(NEWS)
+def _invalidate_news(news_id: Optional[str]) -> None:
+    bump_news_version()
+    bump_news_item(int(news_id) if news_id is not None else None)
+
+# Las noticias incluyen nombre y email del autor: un cambio de usuario las invalida
+@invalidation_handler(USER)
+def _invalidate_authors(user_id: Optional[str]) -> None:
+    bump_news_version()
+    bump_news_item()
@@ -0,0 +1,340 @@
+"""
+Cola de trabajos persistente sobre la tabla jobs (SQLite o PostgreSQL).
+
+Los endpoints encolan efectos secundarios (borrados en Storage, variantes de
+imagen) dentro de la misma transacción que la escritura principal y
+responden en cuanto hace commit. Un bucle por worker los reclama y ejecuta:
+- los borrados pendientes se agrupan en una sola petición a Storage
+- los fallos se reintentan con backoff exponencial hasta max_attempts
+- un barrido periódico borra los objetos del bucket que ninguna noticia usa
+- los trabajos terminados (done / failed) se borran pasados JOB_RETENTION_DAYS
+"""
+from fastapi.concurrency import run_in_threadpool
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Optional
+from sqlalchemy import func, text
+from sqlalchemy.orm import Session
+from app.database import SessionLocal
+from app.models.job import Job
+from app.models.news import News
+from app.core.storage import get_storage
+from urllib.parse import unquote, urlsplit
+import asyncio
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "2"))
+JOB_BATCH_SIZE = int(os.getenv("JOB_BATCH_SIZE", "50"))
+JOB_BACKOFF_BASE = float(os.getenv("JOB_BACKOFF_BASE", "5"))
+JOB_BACKOFF_MAX = float(os.getenv("JOB_BACKOFF_MAX", "3600"))
+# Un trabajo "running" más antiguo que esto se considera abandonado (worker caído)
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "300"))
+ORPHAN_SWEEP_INTERVAL = float(os.getenv("ORPHAN_SWEEP_INTERVAL", str(6 * 3600)))
+# Los objetos más recientes que esto pueden pertenecer a una subida en curso
+ORPHAN_GRACE_SECONDS = float(os.getenv("ORPHAN_GRACE_SECONDS", "3600"))
+# Si más de esta fracción de los objetos (y más de ORPHAN_ABORT_MIN) parece
+# huérfana, el barrido no borra nada
+ORPHAN_MAX_RATIO = float(os.getenv("ORPHAN_MAX_RATIO", "0.5"))
+ORPHAN_ABORT_MIN = int(os.getenv("ORPHAN_ABORT_MIN", "10"))
+ORPHAN_PREFIX = "news"
+# Los trabajos done / failed más antiguos que esto se borran
+JOB_RETENTION_DAYS = float(os.getenv("JOB_RETENTION_DAYS", "7"))
+JOB_PRUNE_INTERVAL = float(os.getenv("JOB_PRUNE_INTERVAL", "3600"))
+
+STORAGE_DELETE = "storage.delete"
+STORAGE_SWEEP = "storage.sweep"
+
+JobHandler = Callable[[dict], Awaitable[None]]
+_handlers: dict[str, JobHandler] = {}
+
+def job_handler(kind: str):
+    """Registra la corrutina que ejecuta los trabajos de un tipo"""
+    def register(fn: JobHandler) -> JobHandler:
+        _handlers[kind] = fn
+        return fn
+    return register
+
+def enqueue(db: Session, kind: str, payload: dict, delay: float = 0) -> Job:
+    """
+    Añade un trabajo a la sesión; se confirma con el commit del llamador,
+    así el efecto secundario solo existe si la escritura principal también.
+    """
+    job = Job(kind=kind, payload=payload, run_after=datetime.now() + timedelta(seconds=delay))
+    db.add(job)
+    return job
+
+def enqueue_storage_delete(db: Session, paths: list) -> Optional[Job]:
+    paths = [path for path in paths if path]
+    if not paths:
+        return None
+    return enqueue(db, STORAGE_DELETE, {"paths": paths})
+
+def enqueue_now(kind: str, payload: dict, delay: float = 0) -> None:
+    """Encola y confirma en una sesión propia (p. ej. tras un rollback)"""
+    db = SessionLocal()
+    try:
+        enqueue(db, kind, payload, delay)
+        db.commit()
+    finally:
+        db.close()
+
+def backoff_delay(attempts: int) -> float:
+    return min(JOB_BACKOFF_MAX, JOB_BACKOFF_BASE * (2 ** max(0, attempts - 1)))
+
+def claim_jobs(limit: int = JOB_BATCH_SIZE) -> list[Job]:
+    """
+    Reclama trabajos vencidos. El UPDATE condicionado a status='pending'
+    garantiza que dos workers no ejecuten el mismo trabajo.
+    """
+    db = SessionLocal()
+    try:
+        now = datetime.now()
+        # Recuperar trabajos de workers que murieron a mitad
+        db.query(Job)\
+            .filter(Job.status == "running", Job.updated_at < now - timedelta(seconds=JOB_LEASE_SECONDS))\
+            .update({Job.status: "pending"}, synchronize_session=False)
+        db.commit()
+
+        candidates = db.query(Job.id)\
+            .filter(Job.status == "pending", Job.run_after <= now)\
+            .order_by(Job.run_after)\
+            .limit(limit)\
+            .all()
+        claimed_ids = []
+        for (job_id,) in candidates:
+            updated = db.query(Job)\
+                .filter(Job.id == job_id, Job.status == "pending")\
+                .update({Job.status: "running", Job.attempts: Job.attempts + 1, Job.updated_at: now},
+                        synchronize_session=False)
+            db.commit()
+            if updated:
+                claimed_ids.append(job_id)
+        if not claimed_ids:
+            return []
+        claimed = db.query(Job).filter(Job.id.in_(claimed_ids)).order_by(Job.run_after).all()
+        db.expunge_all()
+        return claimed
+    finally:
+        db.close()
+
+def finish_jobs(results: list[tuple[Job, Optional[str]]]) -> None:
+    """Marca cada trabajo como hecho, o lo reprograma / falla según el error"""
+    db = SessionLocal()
+    try:
+        now = datetime.now()
+        for job, error in results:
+            if error is None:
+                values = {Job.status: "done", Job.last_error: None}
+            elif job.attempts >= job.max_attempts:
+                logger.error(f"Trabajo {job.id} ({job.kind}) descartado tras {job.attempts} intentos: {error}")
+                values = {Job.status: "failed", Job.last_error: error}
+            else:
+                values = {
+                    Job.status: "pending",
+                    Job.last_error: error,
+                    Job.run_after: now + timedelta(seconds=backoff_delay(job.attempts))
+                }
+            db.query(Job).filter(Job.id == job.id).update(values, synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+def prune_jobs(retention_days: float = JOB_RETENTION_DAYS) -> int:
+    """Borra los trabajos terminados hace más de retention_days"""
+    db = SessionLocal()
+    try:
+        deleted = db.query(Job)\
+            .filter(Job.status.in_(["done", "failed"]), Job.updated_at < datetime.now() - timedelta(days=retention_days))\
+            .delete(synchronize_session=False)
+        db.commit()
+        return deleted
+    finally:
+        db.close()
+
+def ensure_sweep_scheduled(statuses: tuple = ("pending", "running")) -> None:
+    """
+    Deja programado un barrido de huérfanos si no hay ninguno en statuses.
+    En PostgreSQL un advisory lock serializa la comprobación entre workers;
+    en SQLite las escrituras ya se serializan y, si dos coinciden, el
+    barrido sobrante no se reprograma al terminar (ver sweep_orphans).
+    """
+    db = SessionLocal()
+    try:
+        if db.get_bind().dialect.name == "postgresql":
+            db.execute(text("SELECT pg_advisory_xact_lock(hashtext(:name))"), {"name": STORAGE_SWEEP})
+        pending = db.query(Job.id)\
+            .filter(Job.kind == STORAGE_SWEEP, Job.status.in_(statuses))\
+            .first()
+        if pending is None:
+            enqueue(db, STORAGE_SWEEP, {}, delay=ORPHAN_SWEEP_INTERVAL)
+        db.commit()
+    finally:
+        db.close()
+
+def job_counts() -> dict:
+    db = SessionLocal()
+    try:
+        rows = db.query(Job.kind, Job.status, func.count(Job.id)).group_by(Job.kind, Job.status).all()
+        counts: dict = {}
+        for kind, status, count in rows:
+            counts.setdefault(kind, {})[status] = count
+        return counts
+    finally:
+        db.close()
+
+async def run_storage_deletes(jobs: list[Job]) -> list[tuple[Job, Optional[str]]]:
+    """Todos los borrados reclamados van en una única petición a Storage"""
+    paths = sorted({path for job in jobs for path in (job.payload or {}).get("paths", [])})
+    try:
+        await get_storage().delete_many(paths)
+        return [(job, None) for job in jobs]
+    except Exception as e:
+        return [(job, str(e)) for job in jobs]
+
+async def run_job(job: Job) -> tuple[Job, Optional[str]]:
+    handler = _handlers.get(job.kind)
+    if handler is None:
+        return job, f"Tipo de trabajo desconocido: {job.kind}"
+    try:
+        await handler(job.payload or {})
+        return job, None
+    except Exception as e:
+        logger.warning(f"Trabajo {job.id} ({job.kind}) falló en el intento {job.attempts}: {str(e)}")
+        return job, str(e)
+
+def bucket_path(url: Optional[str], prefix: str = ORPHAN_PREFIX) -> Optional[str]:
+    """
+    Ruta dentro del bucket (desde prefix/) de la URL de una imagen, sin
+    depender del host ni de la base: sigue valiendo si cambian SUPABASE_URL,
+    MEDIA_BASE_URL, el dominio o el backend
+    """
+    if not url:
+        return None
+    segments = unquote(urlsplit(url).path).split("/")
+    if prefix not in segments[:-1]:
+        return None
+    start = len(segments) - 1 - segments[::-1].index(prefix)
+    return "/".join(segments[start:])
+
+def referenced_paths() -> set:
+    """Rutas del bucket que usa alguna noticia (imagen y variantes)"""
+    db = SessionLocal()
+    try:
+        paths = set()
+        for image_url, variants in db.query(News.image_url, News.image_variants).yield_per(1000):
+            for url in [image_url] + [variant["url"] for variant in variants or []]:
+                path = bucket_path(url)
+                if path:
+                    paths.add(path)
+        return paths
+    finally:
+        db.close()
+
+def find_orphans(objects: list, referenced: set, cutoff: datetime) -> list:
+    """
+    Objetos sin noticia y más antiguos que cutoff. Sin fecha de creación no
+    se puede descartar una subida en curso: esos nunca son huérfanos.
+    """
+    return [
+        path for path, created_at in objects
+        if path not in referenced and created_at is not None and created_at < cutoff
+    ]
+
+@job_handler(STORAGE_SWEEP)
+async def sweep_orphans(payload: dict) -> None:
+    """
+    Compara el contenido del bucket bajo news/ con las noticias y encola el
+    borrado de lo que no se usa. Se reprograma a sí mismo.
+    """
+    storage = get_storage()
+    # La fecha de corte se fija antes de leer las noticias: un objeto subido
+    # después no puede aparecer como huérfano aunque su noticia aún no exista
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=ORPHAN_GRACE_SECONDS)
+    referenced = await run_in_threadpool(referenced_paths)
+    objects = [item async for item in storage.list_objects(ORPHAN_PREFIX)]
+    orphans = find_orphans(objects, referenced, cutoff)
+    if len(orphans) > ORPHAN_ABORT_MIN and len(orphans) > ORPHAN_MAX_RATIO * len(objects):
+        # Casi todo huérfano suele ser un fallo al relacionar URLs y rutas, no basura real
+        logger.error(
+            f"Barrido de Storage cancelado: {len(orphans)} de {len(objects)} objetos "
+            f"parecen huérfanos (más del {ORPHAN_MAX_RATIO:.0%})"
+        )
+    elif orphans:
+        logger.info(f"Barrido de Storage: {len(orphans)} objetos huérfanos")
+        await run_in_threadpool(enqueue_now, STORAGE_DELETE, {"paths": orphans})
+    # Si el barrido falla, lo reintenta el backoff; si termina, se programa el
+    # siguiente salvo que otro worker ya lo haya hecho
+    await run_in_threadpool(ensure_sweep_scheduled, ("pending",))
+
+class JobWorker:
+    """Bucle de ejecución de trabajos; uno por proceso, arrancado en el lifespan"""
+
+    def __init__(self, poll_interval: float = JOB_POLL_INTERVAL):
+        self.poll_interval = poll_interval
+        self._task: Optional[asyncio.Task] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._last_prune = 0.0
+
+    def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def wake(self) -> None:
+        """Despierta el bucle sin esperar al siguiente sondeo (seguro desde hilos)"""
+        if self._loop is not None and self._wake is not None:
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    async def run_once(self) -> int:
+        jobs = await run_in_threadpool(claim_jobs)
+        if not jobs:
+            return 0
+        deletes = [job for job in jobs if job.kind == STORAGE_DELETE]
+        others = [job for job in jobs if job.kind != STORAGE_DELETE]
+        results = list(await asyncio.gather(*(run_job(job) for job in others)))
+        if deletes:
+            results.extend(await run_storage_deletes(deletes))
+        await run_in_threadpool(finish_jobs, results)
+        return len(jobs)
+
+    async def _run(self) -> None:
+        try:
+            await run_in_threadpool(ensure_sweep_scheduled)
+        except Exception as e:
+            logger.error(f"No se pudo programar el barrido de Storage: {str(e)}")
+        while True:
+            try:
+                processed = await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error en el bucle de trabajos: {str(e)}", exc_info=True)
+                processed = 0
+            if processed:
+                continue
+            if time.monotonic() - self._last_prune > JOB_PRUNE_INTERVAL:
+                self._last_prune = time.monotonic()
+                try:
+                    await run_in_threadpool(prune_jobs)
+                except Exception as e:
+                    logger.error(f"No se pudieron borrar los trabajos antiguos: {str(e)}")
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+job_worker = JobWorker()
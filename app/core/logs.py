@@ -0,0 +1,160 @@
+"""
+Logging sin bloquear el event loop.
+
+setup_logging deja en el logger raíz un único QueueHandler: quien llama a
+logger.info solo encola el LogRecord. Un QueueListener, en su propio hilo,
+formatea (JSON por defecto) y escribe en stderr.
+- El formateo es perezoso: logger.info("x=%s", x) interpola en el hilo del
+  listener. Con f-strings el coste lo paga quien llama.
+- La cola está acotada (LOG_QUEUE_SIZE): si la salida va lenta los
+  registros se descartan y se cuentan, nunca se bloquea una petición.
+- LOG_SAMPLING="app.routes.auth=0.1,uvicorn.access=0.05" guarda solo esa
+  fracción de los registros por debajo de WARNING de cada logger (y sus
+  hijos). Avisos y errores no se muestrean nunca.
+"""
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+import logging
+import os
+import queue
+import random
+import sys
+import threading
+import orjson
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")  # json | text
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+LOG_SAMPLING = os.getenv("LOG_SAMPLING", "")
+# uvicorn configura sus loggers con handlers síncronos propios
+UVICORN_LOGGERS = ("uvicorn", "uvicorn.error", "uvicorn.access")
+
+# Atributos de cualquier LogRecord; el resto llega por extra={...}
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "taskName"}
+
+class JsonFormatter(logging.Formatter):
+    """Una línea JSON por registro, con los campos de extra={...}"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        return orjson.dumps(entry, default=str).decode()
+
+def parse_sampling(value: str) -> dict[str, float]:
+    rates = {}
+    for part in value.split(","):
+        name, _, rate = part.partition("=")
+        if name.strip() and rate.strip():
+            rates[name.strip()] = min(1.0, max(0.0, float(rate)))
+    return rates
+
+class SamplingFilter(logging.Filter):
+    """Muestreo por logger de los registros de nivel inferior a WARNING"""
+
+    def __init__(self, rates: dict[str, float]):
+        super().__init__()
+        self.rates = rates
+        self._by_logger: dict[str, float] = {}
+        self.sampled_out = 0
+
+    def rate_for(self, name: str) -> float:
+        rate = self._by_logger.get(name)
+        if rate is None:
+            # La regla más específica: "app.routes" cubre "app.routes.auth"
+            rate = 1.0
+            for prefix in sorted(self.rates, key=len, reverse=True):
+                if name == prefix or name.startswith(prefix + "."):
+                    rate = self.rates[prefix]
+                    break
+            self._by_logger[name] = rate
+        return rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or not self.rates:
+            return True
+        rate = self.rate_for(record.name)
+        if rate >= 1.0 or random.random() < rate:
+            return True
+        self.sampled_out += 1
+        return False
+
+class DroppingQueueHandler(QueueHandler):
+    """QueueHandler que no bloquea: con la cola llena descarta y cuenta"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Sin formatear aquí (QueueHandler lo haría en el hilo que llama):
+        # el listener vive en el mismo proceso y puede usar el registro tal cual
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+class LogPipeline:
+    def __init__(self):
+        self.handler: Optional[DroppingQueueHandler] = None
+        self.sampling: Optional[SamplingFilter] = None
+        self.listener: Optional[QueueListener] = None
+        self._lock = threading.Lock()
+
+    def start(self, level: str = LOG_LEVEL, log_format: str = LOG_FORMAT, sampling: str = LOG_SAMPLING) -> None:
+        with self._lock:
+            if self.listener is not None:
+                return
+            log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+            self.handler = DroppingQueueHandler(log_queue)
+            self.sampling = SamplingFilter(parse_sampling(sampling))
+            self.handler.addFilter(self.sampling)
+
+            sink = logging.StreamHandler(sys.stderr)
+            if log_format == "text":
+                sink.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+            else:
+                sink.setFormatter(JsonFormatter())
+            self.listener = QueueListener(log_queue, sink, respect_handler_level=True)
+
+            root = logging.getLogger()
+            for handler in list(root.handlers):
+                root.removeHandler(handler)
+            root.addHandler(self.handler)
+            root.setLevel(level)
+            for name in UVICORN_LOGGERS:
+                uvicorn_logger = logging.getLogger(name)
+                uvicorn_logger.handlers.clear()
+                uvicorn_logger.propagate = True
+            self.listener.start()
+
+    def stop(self) -> None:
+        """Vacía la cola y para el hilo (al apagar el worker)"""
+        with self._lock:
+            if self.listener is not None:
+                self.listener.stop()
+                self.listener = None
+
+    def stats(self) -> dict:
+        return {
+            "queued": self.handler.queue.qsize() if self.handler else 0,
+            "capacity": LOG_QUEUE_SIZE,
+            "dropped": self.handler.dropped if self.handler else 0,
+            "sampled_out": self.sampling.sampled_out if self.sampling else 0,
+        }
+
+log_pipeline = LogPipeline()
@@ -0,0 +1,246 @@
+"""
+Métricas en memoria (por worker) en formato de texto de Prometheus.
+
+Sin dependencias: cada métrica es un diccionario etiquetas -> valores
+protegido por un lock, y una observación cuesta una búsqueda binaria en
+los buckets. Se exponen en /metrics (ver METRICS_TOKEN).
+
+- MetricsMiddleware: latencia, respuestas por status y peticiones en curso
+  por ruta (la plantilla, p. ej. /api/news/{news_id}, no la URL).
+- Eventos de SQLAlchemy: número de consultas y tiempo de base de datos
+  por petición, para que los N+1 se vean en el histograma.
+"""
+from contextvars import ContextVar
+from typing import Callable, Iterable, Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+import bisect
+import threading
+import time
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100)
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: dict = {}
+
+    def header(self) -> list[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> list[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return self.header() + [
+            f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}" for labels, value in items
+        ]
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *labels, amount: float = 1) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def set(self, *labels, value: float) -> None:
+        with self._lock:
+            self._values[labels] = value
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (), buckets: tuple = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, *labels, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                # Conteos por bucket (no acumulados), suma y total
+                entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def render(self) -> list[str]:
+        with self._lock:
+            items = [(labels, (list(counts), total, count)) for labels, (counts, total, count) in self._values.items()]
+        lines = self.header()
+        for labels, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = f'le="{_number(float(bound))}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {count}")
+        return lines
+
+class Registry:
+    def __init__(self):
+        self._metrics: list[Metric] = []
+        # Funciones que devuelven métricas calculadas en el momento de leerlas
+        self._collectors: list[Callable[[], Iterable[Metric]]] = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def collector(self, fn: Callable[[], Iterable[Metric]]):
+        self._collectors.append(fn)
+        return fn
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collect in self._collectors:
+            try:
+                for metric in collect():
+                    lines.extend(metric.render())
+            except Exception as e:
+                lines.append(f"# collector {collect.__name__} failed: {_escape(e)}")
+        return "\n".join(lines) + "\n"
+
+registry = Registry()
+
+HTTP_REQUEST_SECONDS = registry.register(Histogram(
+    "http_request_duration_seconds", "Latencia de las peticiones HTTP", ("method", "route")
+))
+HTTP_RESPONSES = registry.register(Counter(
+    "http_responses_total", "Respuestas HTTP por status", ("method", "route", "status")
+))
+HTTP_IN_FLIGHT = registry.register(Gauge(
+    "http_requests_in_flight", "Peticiones HTTP en curso", ("method",)
+))
+DB_QUERIES_PER_REQUEST = registry.register(Histogram(
+    "http_request_db_queries", "Consultas SQL por petición", ("method", "route"), buckets=COUNT_BUCKETS
+))
+DB_SECONDS_PER_REQUEST = registry.register(Histogram(
+    "http_request_db_seconds", "Tiempo total de base de datos por petición", ("method", "route")
+))
+DB_QUERY_SECONDS = registry.register(Histogram(
+    "db_query_duration_seconds", "Duración de cada consulta SQL", ("engine",)
+))
+STORAGE_REQUEST_SECONDS = registry.register(Histogram(
+    "storage_request_duration_seconds", "Peticiones HTTP a Supabase Storage", ("method", "status")
+))
+PASSWORD_SECONDS = registry.register(Histogram(
+    "password_operation_duration_seconds", "bcrypt: espera en cola más cómputo", ("operation",)
+))
+CACHE_INVALIDATION_DELAY = registry.register(Histogram(
+    "cache_invalidation_delay_seconds", "Desde la publicación de un cambio hasta que este worker lo aplica", ("entity",)
+))
+
+class RequestStats:
+    __slots__ = ("queries", "db_seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+
+# Se copia al threadpool con el contexto, así las consultas de los
+# endpoints síncronos se suman a la petición que las originó
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get("query_started")
+    if not started:
+        return
+    elapsed = time.perf_counter() - started.pop()
+    DB_QUERY_SECONDS.observe(conn.engine.url.get_backend_name(), value=elapsed)
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_seconds += elapsed
+
+@event.listens_for(Engine, "handle_error")
+def _handle_error(context):
+    # Una consulta fallida no llega a after_cursor_execute
+    started = context.connection.info.get("query_started") if context.connection is not None else None
+    if started:
+        started.pop()
+
+def route_template(scope) -> str:
+    """
+    Ruta resuelta con los parámetros como plantilla: /api/news/5 -> /api/news/{news_id}.
+    Las peticiones que no llegan a ningún endpoint se agrupan para no
+    crear una serie por cada URL desconocida.
+    """
+    if scope.get("endpoint") is None:
+        return "unmatched"
+    path = scope.get("path", "")
+    for name, value in (scope.get("path_params") or {}).items():
+        head, separator, tail = path.rpartition(f"/{value}")
+        if separator and (not tail or tail.startswith("/")):
+            path = f"{head}/{{{name}}}{tail}"
+    return path
+
+class MetricsMiddleware:
+    """Middleware ASGI puro: no envuelve la respuesta ni copia el cuerpo"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status_code = 500
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc(method)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            HTTP_IN_FLIGHT.dec(method)
+            _request_stats.reset(token)
+            route = route_template(scope)
+            HTTP_REQUEST_SECONDS.observe(method, route, value=elapsed)
+            HTTP_RESPONSES.inc(method, route, str(status_code))
+            DB_QUERIES_PER_REQUEST.observe(method, route, value=stats.queries)
+            DB_SECONDS_PER_REQUEST.observe(method, route, value=stats.db_seconds)
@@ -0,0 +1,52 @@
+from fastapi import HTTPException
+from datetime import datetime
+from typing import Optional, Tuple
+import base64
+import json
+
+CURSOR_HEADER = "X-Next-Cursor"
+
+def encode_cursor(date: datetime, news_id: int) -> str:
+    """Codifica la posición (date, id) como un token opaco"""
+    raw = json.dumps([date.isoformat(), news_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Decodifica un token generado por encode_cursor"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        date_str, news_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return datetime.fromisoformat(date_str), int(news_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+def clamp_limit(limit: Optional[int], default: int, maximum: int) -> int:
+    if limit is None:
+        return default
+    return max(1, min(limit, maximum))
+
+def apply_keyset(query, model, cursor: Optional[str]):
+    """
+    Ordena por (date DESC, id DESC) y, si hay cursor, continúa
+    justo después de la última fila devuelta.
+    El coste de cada página es el mismo gracias al índice ix_news_date_id.
+    El llamador debe pedir limit + 1 filas para saber si hay otra página.
+    """
+    if cursor:
+        cursor_date, cursor_id = decode_cursor(cursor)
+        query = query.filter(
+            (model.date < cursor_date) |
+            ((model.date == cursor_date) & (model.id < cursor_id))
+        )
+    return query.order_by(model.date.desc(), model.id.desc())
+
+def split_page(rows, limit: int):
+    """
+    Recibe hasta limit + 1 filas (ver apply_keyset) y devuelve la página
+    junto con el cursor de la siguiente, o None si no hay más filas.
+    """
+    page = rows[:limit]
+    if len(rows) <= limit or not page:
+        return page, None
+    last = page[-1]
+    return page, encode_cursor(last.date, last.id)
@@ -0,0 +1,227 @@
+"""
+Búsqueda de texto completo sobre title, subtitle y body.
+
+- PostgreSQL: columna news.search_vector (tsvector, pesos A/B/C) con índice GIN.
+- SQLite: tabla virtual FTS5 news_fts cuyo rowid es el id de la noticia.
+
+Ninguna de las dos está en el modelo (no son portables): las crea
+ensure_search_schema y las mantienen index_news / unindex_news, que los
+endpoints llaman dentro de la misma transacción que la escritura.
+Cada consulta usa el índice invertido, así el coste depende del número de
+coincidencias y no del tamaño total de la tabla.
+"""
+from fastapi import HTTPException
+from sqlalchemy import bindparam, text
+from sqlalchemy.orm import Session
+from typing import Optional
+import base64
+import html
+import json
+import os
+import re
+
+SEARCH_LANGUAGE = os.getenv("SEARCH_LANGUAGE", "spanish")
+SNIPPET_START = "<mark>"
+SNIPPET_STOP = "</mark>"
+SNIPPET_WORDS = 24
+# La base de datos marca las coincidencias con estos caracteres de uso
+# privado; el texto se escapa como HTML y solo después pasan a <mark>
+_SENTINEL_START = "\ue000"
+_SENTINEL_STOP = "\ue001"
+
+# Ni FTS5 ni to_tsquery aceptan cualquier texto: se buscan solo las palabras
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+_PG_VECTOR = """
+    setweight(to_tsvector(CAST(:language AS regconfig), coalesce(title, '')), 'A') ||
+    setweight(to_tsvector(CAST(:language AS regconfig), coalesce(subtitle, '')), 'B') ||
+    setweight(to_tsvector(CAST(:language AS regconfig), coalesce(body, '')), 'C')
+"""
+
+def search_dialect(db_or_engine) -> str:
+    bind = db_or_engine.get_bind() if isinstance(db_or_engine, Session) else db_or_engine
+    return bind.dialect.name
+
+def query_terms(q: str) -> list[str]:
+    return _WORD.findall(q.lower())[:16]
+
+def ensure_search_schema(engine) -> None:
+    """Crea la columna/tabla de búsqueda y su índice si faltan (ver create_db.py)"""
+    dialect = search_dialect(engine)
+    with engine.begin() as conn:
+        if dialect == "postgresql":
+            conn.execute(text("ALTER TABLE news ADD COLUMN IF NOT EXISTS search_vector tsvector"))
+            conn.execute(text("CREATE INDEX IF NOT EXISTS ix_news_search_vector ON news USING GIN (search_vector)"))
+        elif dialect == "sqlite":
+            conn.execute(text(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS news_fts USING fts5("
+                "title, subtitle, body, tokenize = 'unicode61 remove_diacritics 2')"
+            ))
+
+def rebuild_search_index(db: Session, only_missing: bool = True) -> None:
+    """Indexa las noticias existentes (todas, o solo las que faltan)"""
+    dialect = search_dialect(db)
+    if dialect == "postgresql":
+        condition = "WHERE search_vector IS NULL" if only_missing else ""
+        db.execute(text(f"UPDATE news SET search_vector = {_PG_VECTOR} {condition}"), {"language": SEARCH_LANGUAGE})
+    elif dialect == "sqlite":
+        if not only_missing:
+            db.execute(text("DELETE FROM news_fts"))
+        db.execute(text(
+            "INSERT INTO news_fts (rowid, title, subtitle, body) "
+            "SELECT id, coalesce(title, ''), coalesce(subtitle, ''), coalesce(body, '') FROM news "
+            "WHERE id NOT IN (SELECT rowid FROM news_fts)"
+        ))
+
+def index_news(db: Session, news) -> None:
+    """Actualiza la entrada de búsqueda de una noticia; requiere el id (flush)"""
+    dialect = search_dialect(db)
+    if dialect == "postgresql":
+        db.execute(
+            text(f"UPDATE news SET search_vector = {_PG_VECTOR} WHERE id = :id"),
+            {"language": SEARCH_LANGUAGE, "id": news.id}
+        )
+    elif dialect == "sqlite":
+        db.execute(text("DELETE FROM news_fts WHERE rowid = :id"), {"id": news.id})
+        db.execute(
+            text("INSERT INTO news_fts (rowid, title, subtitle, body) VALUES (:id, :title, :subtitle, :body)"),
+            {"id": news.id, "title": news.title or "", "subtitle": news.subtitle or "", "body": news.body or ""}
+        )
+
+def index_news_ids(db: Session, news_ids: list) -> None:
+    """Indexa un lote de noticias ya guardadas (p. ej. una importación)"""
+    if not news_ids:
+        return
+    dialect = search_dialect(db)
+    params = {"ids": list(news_ids)}
+    if dialect == "postgresql":
+        db.execute(
+            text(f"UPDATE news SET search_vector = {_PG_VECTOR} WHERE id IN :ids").bindparams(bindparam("ids", expanding=True)),
+            {"language": SEARCH_LANGUAGE, **params}
+        )
+    elif dialect == "sqlite":
+        db.execute(text("DELETE FROM news_fts WHERE rowid IN :ids").bindparams(bindparam("ids", expanding=True)), params)
+        db.execute(text(
+            "INSERT INTO news_fts (rowid, title, subtitle, body) "
+            "SELECT id, coalesce(title, ''), coalesce(subtitle, ''), coalesce(body, '') FROM news WHERE id IN :ids"
+        ).bindparams(bindparam("ids", expanding=True)), params)
+
+def unindex_news(db: Session, news_id: int) -> None:
+    # En PostgreSQL la columna desaparece con la fila
+    if search_dialect(db) == "sqlite":
+        db.execute(text("DELETE FROM news_fts WHERE rowid = :id"), {"id": news_id})
+
+def encode_search_cursor(score: float, news_id: int) -> str:
+    raw = json.dumps([score, news_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_search_cursor(cursor: str) -> tuple[float, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        score, news_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return float(score), int(news_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+def highlight(snippet: Optional[str]) -> Optional[str]:
+    """Fragmento con el texto de la noticia escapado y <mark> en las coincidencias"""
+    if snippet is None:
+        return None
+    return html.escape(snippet)\
+        .replace(_SENTINEL_START, SNIPPET_START)\
+        .replace(_SENTINEL_STOP, SNIPPET_STOP)
+
+def search_news(db: Session, q: str, limit: int, cursor: Optional[str] = None):
+    """
+    Devuelve ([(id, score, snippet)], cursor siguiente) ordenado por
+    relevancia descendente y, a igualdad, por id descendente.
+    La página continúa tras (score, id) del cursor; los snippets (de la
+    columna donde mejor coincide) solo se calculan para las filas de la página.
+    """
+    terms = query_terms(q)
+    if not terms:
+        return [], None
+    after = decode_search_cursor(cursor) if cursor else None
+    dialect = search_dialect(db)
+    if dialect == "postgresql":
+        rows = _search_postgresql(db, q, limit + 1, after)
+    elif dialect == "sqlite":
+        rows = _search_sqlite(db, terms, limit + 1, after)
+    else:
+        raise HTTPException(status_code=501, detail="Búsqueda no disponible para esta base de datos")
+
+    page = [(news_id, score, highlight(snippet)) for news_id, score, snippet in rows[:limit]]
+    next_cursor = None
+    if len(rows) > limit and page:
+        next_cursor = encode_search_cursor(page[-1][1], page[-1][0])
+    return page, next_cursor
+
+def _keyset(after, score_column: str, id_column: str) -> tuple[str, dict]:
+    if after is None:
+        return "", {}
+    return (
+        f"AND ({score_column} < :after_score OR ({score_column} = :after_score AND {id_column} < :after_id))",
+        {"after_score": after[0], "after_id": after[1]}
+    )
+
+def _search_postgresql(db: Session, q: str, limit: int, after) -> list:
+    condition, params = _keyset(after, "score", "id")
+    return [tuple(row) for row in db.execute(text(f"""
+        WITH query AS (SELECT websearch_to_tsquery(CAST(:language AS regconfig), :q) AS tsq),
+        matches AS (
+            SELECT news.id, CAST(ts_rank_cd(news.search_vector, query.tsq) AS float8) AS score
+            FROM news, query
+            WHERE news.search_vector @@ query.tsq
+        ),
+        page AS (
+            SELECT id, score FROM matches
+            WHERE true {condition}
+            ORDER BY score DESC, id DESC
+            LIMIT :limit
+        )
+        SELECT page.id, page.score,
+               ts_headline(CAST(:language AS regconfig),
+                           concat_ws(' ', news.title, news.subtitle, news.body),
+                           query.tsq, :headline_options)
+        FROM page JOIN news ON news.id = page.id, query
+        ORDER BY page.score DESC, page.id DESC
+    """), {
+        "language": SEARCH_LANGUAGE,
+        "q": q,
+        "limit": limit,
+        "headline_options": (
+            f"StartSel=\"{_SENTINEL_START}\", StopSel=\"{_SENTINEL_STOP}\", "
+            f"MaxWords={SNIPPET_WORDS}, MinWords={SNIPPET_WORDS // 2}, MaxFragments=2"
+        ),
+        **params
+    })]
+
+def _search_sqlite(db: Session, terms: list, limit: int, after) -> list:
+    # Cada palabra como prefijo entre comillas: sin operadores ni errores de sintaxis
+    match = " ".join(f'"{term}"*' for term in terms)
+    # bm25 es menor cuanto más relevante: se invierte para ordenar como en PostgreSQL
+    condition, params = _keyset(after, "score", "id")
+    page = db.execute(text(f"""
+        SELECT id, score FROM (
+            SELECT rowid AS id, -bm25(news_fts, 10.0, 4.0, 1.0) AS score
+            FROM news_fts WHERE news_fts MATCH :match
+        )
+        WHERE 1 = 1 {condition}
+        ORDER BY score DESC, id DESC
+        LIMIT :limit
+    """), {"match": match, "limit": limit, **params}).all()
+    if not page:
+        return []
+    snippet_params = {f"id{i}": row.id for i, row in enumerate(page)}
+    snippets = dict(db.execute(text(f"""
+        SELECT rowid, snippet(news_fts, -1, :start, :stop, '…', :words)
+        FROM news_fts
+        WHERE news_fts MATCH :match AND rowid IN ({", ".join(f":{name}" for name in snippet_params)})
+    """), {
+        "match": match,
+        "start": _SENTINEL_START,
+        "stop": _SENTINEL_STOP,
+        "words": min(SNIPPET_WORDS, 64),
+        **snippet_params
+    }).all())
+    return [(row.id, row.score, snippets.get(row.id)) for row in page]
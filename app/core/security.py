@@ -1,5 +1,4 @@
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from datetime import datetime, timedelta
 from fastapi import HTTPException, status, Depends
 from fastapi.security import OAuth2PasswordBearer, SecurityScopes
@@ -8,33 +7,28 @@ from pydantic import BaseModel
 from sqlalchemy.orm import Session
 from app.database import get_db
 from app.models.user import User as UserModel
+from app.core.hashing import PasswordPoolSaturated, PasswordPoolTimeout, PasswordPoolUnavailable, password_pool
+from app.core.cache import TTLCache
+from app.core.metrics import PASSWORD_SECONDS
+from app.core.invalidation import USER, invalidation_handler
 from dotenv import load_dotenv
-from supabase import create_client
 import os
 import logging
-import bcrypt
+import hashlib
+import threading
+import time
+import uuid
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 load_dotenv()
 
 SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_KEY")
 SUPABASE_JWT_SECRET = os.getenv("SECRET_KEY")
 
-supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
-
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-pwd_context = CryptContext(
-    schemes=["bcrypt"],
-    deprecated="auto",
-    bcrypt__rounds=12,
-    bcrypt__ident="2b"
-)
-
 oauth2_scheme = OAuth2PasswordBearer(
     tokenUrl="auth/login",
     scopes={
@@ -48,20 +42,39 @@ class TokenData(BaseModel):
     scopes: list[str] = []
     role: Optional[str] = None
 
+def _password_pool_unavailable() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Server busy, please retry",
+        headers={"Retry-After": "1"},
+    )
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Versión robusta de verificación de contraseña"""
+    """
+    Versión robusta de verificación de contraseña.
+    bcrypt se ejecuta en el pool de procesos (ver app.core.hashing);
+    llamar solo desde endpoints síncronos, nunca desde el event loop.
+    """
     try:
-        # Verificación directa con bcrypt como respaldo
-        if hashed_password.startswith(("$2a$", "$2b$", "$2y$")):
-            return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
-        return pwd_context.verify(plain_password, hashed_password)
+        started = time.perf_counter()
+        valid = password_pool.verify(plain_password, hashed_password)
+        PASSWORD_SECONDS.observe("verify", value=time.perf_counter() - started)
+        return valid
+    except (PasswordPoolSaturated, PasswordPoolTimeout, PasswordPoolUnavailable):
+        raise _password_pool_unavailable()
     except Exception as e:
         logger.error(f"Password verification error: {str(e)}")
         return False
 
 def get_password_hash(password: str) -> str:
-    """Generación de hash usando bcrypt directamente"""
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=12)).decode('utf-8')
+    """Generación de hash con bcrypt en el pool de procesos"""
+    try:
+        started = time.perf_counter()
+        hashed = password_pool.hash(password)
+        PASSWORD_SECONDS.observe("hash", value=time.perf_counter() - started)
+        return hashed
+    except (PasswordPoolSaturated, PasswordPoolTimeout, PasswordPoolUnavailable):
+        raise _password_pool_unavailable()
 
 def create_access_token(data: dict) -> str:
     to_encode = data.copy()
@@ -106,10 +119,78 @@ def decode_token(token: str) -> dict:
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-async def get_current_user(
+class Principal:
+    """
+    Usuario autenticado tal como lo necesitan los endpoints.
+    Se guarda en caché en lugar del objeto ORM, que está ligado a su sesión.
+    """
+    __slots__ = ("id", "email", "first_name", "last_name", "role", "is_active", "claims")
+
+    def __init__(self, user: UserModel, claims: dict):
+        self.id = user.id
+        self.email = user.email
+        self.first_name = user.first_name
+        self.last_name = user.last_name
+        self.role = user.role
+        self.is_active = user.is_active
+        self.claims = claims
+
+# Caché de usuarios autenticados, indexada por el hash del token.
+# Cada entrada guarda la "generación" del usuario al crearse: evict_principal
+# la incrementa y todas las entradas anteriores de ese usuario dejan de valer.
+principal_cache = TTLCache(
+    maxsize=int(os.getenv("PRINCIPAL_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("PRINCIPAL_CACHE_TTL", "60")),
+    name="principals",
+)
+_principal_generations: dict = {}
+_generation_lock = threading.Lock()
+
+def _token_key(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+def evict_principal(user_id) -> None:
+    """Invalida de inmediato todas las entradas en caché de un usuario"""
+    with _generation_lock:
+        _principal_generations[user_id] = _principal_generations.get(user_id, 0) + 1
+
+@invalidation_handler(USER)
+def _invalidate_principal(user_id: Optional[str]) -> None:
+    # Publicado por otro worker (o tras el commit en este)
+    if user_id is None:
+        principal_cache.clear()
+    else:
+        evict_principal(uuid.UUID(user_id))
+
+def _cached_principal(token: str) -> Optional[Principal]:
+    entry = principal_cache.get(_token_key(token))
+    if entry is None:
+        return None
+    principal, generation = entry
+    if _principal_generations.get(principal.id, 0) != generation:
+        principal_cache.pop(_token_key(token))
+        return None
+    return principal
+
+def _cache_principal(token: str, principal: Principal, generation: int) -> None:
+    exp = principal.claims.get("exp")
+    ttl = principal_cache.ttl
+    if exp is not None:
+        # Nunca más allá de la expiración del propio token
+        ttl = min(ttl, exp - time.time())
+    if ttl > 0:
+        principal_cache.set(_token_key(token), (principal, generation), ttl=ttl)
+
+# Dependencia síncrona a propósito: FastAPI la ejecuta en el threadpool y
+# la consulta a la base de datos no bloquea el event loop.
+def get_current_user(
     token: str = Depends(oauth2_scheme),
     db: Session = Depends(get_db)
-) -> UserModel:
+) -> Principal:
+    principal = _cached_principal(token)
+    if principal is not None:
+        return principal
+
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -127,7 +208,13 @@ async def get_current_user(
     user = db.query(UserModel).filter(UserModel.email == email).first()
     if user is None:
         raise credentials_exception
-    return user
+
+    # La generación se lee antes de construir la entrada: si llega una
+    # invalidación en medio, la entrada nace ya caducada.
+    generation = _principal_generations.get(user.id, 0)
+    principal = Principal(user, payload)
+    _cache_principal(token, principal, generation)
+    return principal
 
 def verify_token(token: str, db: Session):
     try:
@@ -156,8 +243,8 @@ def verify_token(token: str, db: Session):
         )
     
 async def get_current_active_user(
-    current_user: UserModel = Depends(get_current_user)
-) -> UserModel:
+    current_user: Principal = Depends(get_current_user)
+) -> Principal:
     if not current_user.is_active:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -166,8 +253,8 @@ async def get_current_active_user(
     return current_user
 
 async def require_admin(
-    current_user: UserModel = Depends(get_current_active_user)
-) -> UserModel:
+    current_user: Principal = Depends(get_current_active_user)
+) -> Principal:
     if current_user.role != "admin":
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
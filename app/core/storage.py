@@ -0,0 +1,403 @@
+"""
+Almacenamiento de imágenes detrás de una interfaz común (Storage):
+- SupabaseStorage: API REST de Supabase Storage (por defecto)
+- LocalStorage: disco local, servido por la ruta /media (app.routes.media)
+
+STORAGE_BACKEND=supabase|local elige la implementación del worker.
+"""
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from typing import AsyncIterator, Iterable, Optional
+from fastapi.concurrency import run_in_threadpool
+import asyncio
+import logging
+import os
+import tempfile
+import time
+import httpx
+from app.core.metrics import STORAGE_REQUEST_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Métodos que se pueden repetir sin riesgo ante un error de red o un 5xx
+IDEMPOTENT_METHODS = {"GET", "HEAD", "DELETE"}
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+class StorageError(Exception):
+    """Error del servicio de almacenamiento, con el status HTTP a devolver"""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+class Storage(ABC):
+    """
+    Interfaz de almacenamiento. Las rutas son relativas al bucket
+    (p. ej. "news/<uuid>.png") y las URLs públicas se guardan en la noticia.
+    """
+
+    @property
+    def configured(self) -> bool:
+        return True
+
+    @abstractmethod
+    def public_url(self, path: str) -> str:
+        ...
+
+    def path_from_url(self, url: Optional[str]) -> Optional[str]:
+        """Ruta dentro del bucket de una URL pública, o None si no es nuestra"""
+        prefix = self.public_url("")
+        if url and url.startswith(prefix):
+            return url[len(prefix):]
+        return None
+
+    @abstractmethod
+    async def upload(
+        self,
+        path: str,
+        content,
+        content_type: str,
+        content_length: Optional[int] = None,
+        timeout: Optional[float] = None
+    ) -> str:
+        """
+        Guarda un objeto (sobrescribe si existe) y devuelve su URL pública.
+        content puede ser bytes o un iterable asíncrono de trozos (streaming).
+        """
+
+    @abstractmethod
+    async def download(self, path: str) -> bytes:
+        ...
+
+    @abstractmethod
+    async def delete(self, path: str) -> None:
+        """Borra un objeto; no es un error que no exista"""
+
+    @abstractmethod
+    async def delete_many(self, paths: Iterable[str]) -> None:
+        ...
+
+    @abstractmethod
+    def list_objects(self, prefix: str) -> AsyncIterator[tuple[str, Optional[datetime]]]:
+        """(ruta, fecha de creación) de cada objeto bajo prefix, recursivamente"""
+
+    async def close(self) -> None:
+        pass
+
+class SupabaseStorage(Storage):
+    """
+    Cliente REST de Supabase Storage compartido por todo el worker.
+    Mantiene un único httpx.AsyncClient con pool de conexiones y keep-alive,
+    de modo que cada subida o borrado reutiliza una conexión TLS abierta.
+    """
+
+    def __init__(
+        self,
+        base_url: Optional[str],
+        service_key: Optional[str],
+        bucket: str,
+        max_connections: int = 20,
+        max_keepalive: int = 10,
+        keepalive_expiry: float = 30.0,
+        http2: bool = False,
+        timeout: float = 30.0,
+        retries: int = 3,
+        backoff: float = 0.2
+    ):
+        self.base_url = (base_url or "").rstrip("/")
+        self.service_key = service_key
+        self.bucket = bucket
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self._limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+            keepalive_expiry=keepalive_expiry
+        )
+        self._http2 = http2
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @classmethod
+    def from_env(cls) -> "SupabaseStorage":
+        http2 = os.getenv("STORAGE_HTTP2", "false").lower() in ("1", "true", "yes")
+        if http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                logger.warning("STORAGE_HTTP2 activo pero falta el paquete h2; se usa HTTP/1.1")
+                http2 = False
+        return cls(
+            base_url=os.getenv("SUPABASE_URL"),
+            service_key=os.getenv("SUPABASE_SERVICE_ROLE"),
+            bucket=os.getenv("SUPABASE_BUCKET", "newsimages"),
+            max_connections=int(os.getenv("STORAGE_MAX_CONNECTIONS", "20")),
+            max_keepalive=int(os.getenv("STORAGE_MAX_KEEPALIVE", "10")),
+            http2=http2,
+            timeout=float(os.getenv("STORAGE_TIMEOUT", "30")),
+            retries=int(os.getenv("STORAGE_RETRIES", "3")),
+            backoff=float(os.getenv("STORAGE_BACKOFF", "0.2")),
+        )
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.base_url and self.service_key)
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=f"{self.base_url}/storage/v1",
+                headers={
+                    "Authorization": f"Bearer {self.service_key}",
+                    "apikey": self.service_key or ""
+                },
+                limits=self._limits,
+                http2=self._http2,
+                timeout=self.timeout
+            )
+        return self._client
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def public_url(self, path: str) -> str:
+        return f"{self.base_url}/storage/v1/object/public/{self.bucket}/{path}"
+
+    async def request(
+        self,
+        method: str,
+        url: str,
+        timeout: Optional[float] = None,
+        idempotent: Optional[bool] = None,
+        **kwargs
+    ) -> httpx.Response:
+        """
+        Petición con reintentos y backoff exponencial, solo para métodos
+        idempotentes. Los errores de red acaban como StorageError(503).
+        """
+        if idempotent is None:
+            idempotent = method in IDEMPOTENT_METHODS
+        attempts = self.retries + 1 if idempotent else 1
+        for attempt in range(attempts):
+            started = time.perf_counter()
+            try:
+                response = await self.client.request(
+                    method, url, timeout=timeout or self.timeout, **kwargs
+                )
+                STORAGE_REQUEST_SECONDS.observe(method, str(response.status_code), value=time.perf_counter() - started)
+                if response.status_code not in RETRY_STATUS or attempt == attempts - 1:
+                    return response
+            except httpx.RequestError as exc:
+                STORAGE_REQUEST_SECONDS.observe(method, "error", value=time.perf_counter() - started)
+                if attempt == attempts - 1:
+                    logger.error(f"Error de conexión con Supabase: {str(exc)}")
+                    raise StorageError(503, "Error al conectar con el servicio de almacenamiento")
+            await asyncio.sleep(self.backoff * (2 ** attempt))
+
+    async def upload(
+        self,
+        path: str,
+        content,
+        content_type: str,
+        content_length: Optional[int] = None,
+        timeout: Optional[float] = None
+    ) -> str:
+        # En streaming se envía Content-Length si se conoce el tamaño
+        headers = {"Content-Type": content_type, "x-upsert": "true"}
+        if content_length is not None:
+            headers["Content-Length"] = str(content_length)
+        response = await self.request(
+            "POST",
+            f"/object/{self.bucket}/{path}",
+            content=content,
+            headers=headers,
+            timeout=timeout
+        )
+        if response.status_code != 200:
+            raise StorageError(response.status_code, f"Error al subir imagen: {response.text}")
+        return self.public_url(path)
+
+    async def download(self, path: str) -> bytes:
+        response = await self.request("GET", f"/object/{self.bucket}/{path}")
+        if response.status_code != 200:
+            raise StorageError(response.status_code, f"Error descargando {path}: {response.text}")
+        return response.content
+
+    async def delete(self, path: str) -> None:
+        response = await self.request("DELETE", f"/object/{self.bucket}/{path}")
+        if response.status_code not in (200, 204, 404):
+            raise StorageError(response.status_code, f"Error eliminando {path}: {response.text}")
+
+    async def delete_many(self, paths: Iterable[str]) -> None:
+        """Borra varios objetos en una sola petición"""
+        paths = list(paths)
+        if not paths:
+            return
+        response = await self.request(
+            "DELETE", f"/object/{self.bucket}", json={"prefixes": paths}
+        )
+        if response.status_code not in (200, 204):
+            raise StorageError(response.status_code, f"Error eliminando imágenes: {response.text}")
+
+    async def list_objects(self, prefix: str, page_size: int = 1000) -> AsyncIterator[tuple[str, Optional[datetime]]]:
+        """
+        Recorre recursivamente el bucket bajo prefix y produce
+        (ruta, fecha de creación) de cada objeto.
+        """
+        folders = [prefix.strip("/")]
+        while folders:
+            folder = folders.pop()
+            offset = 0
+            while True:
+                response = await self.request(
+                    "POST",
+                    f"/object/list/{self.bucket}",
+                    json={
+                        "prefix": folder,
+                        "limit": page_size,
+                        "offset": offset,
+                        "sortBy": {"column": "name", "order": "asc"}
+                    },
+                    idempotent=True
+                )
+                if response.status_code != 200:
+                    raise StorageError(response.status_code, f"Error listando {folder}: {response.text}")
+                items = response.json()
+                for item in items:
+                    path = f"{folder}/{item['name']}" if folder else item["name"]
+                    if item.get("id") is None:
+                        # Las carpetas no tienen id
+                        folders.append(path)
+                        continue
+                    created_at = item.get("created_at")
+                    if created_at:
+                        created_at = datetime.fromisoformat(created_at.replace("Z", "+00:00"))
+                    yield path, created_at
+                if len(items) < page_size:
+                    break
+                offset += page_size
+
+class LocalStorage(Storage):
+    """
+    Objetos en un directorio local (p. ej. un SSD en despliegues propios).
+    Las escrituras van a un fichero temporal y se renombran al terminar:
+    nunca se sirve una imagen a medias. El disco se toca en el threadpool.
+    """
+
+    def __init__(self, root: str, base_url: str = "/media"):
+        self.root = os.path.realpath(root)
+        self.base_url = base_url.rstrip("/")
+
+    @classmethod
+    def from_env(cls) -> "LocalStorage":
+        return cls(
+            root=os.getenv("LOCAL_STORAGE_PATH", "media"),
+            base_url=os.getenv("MEDIA_BASE_URL", "/media"),
+        )
+
+    def public_url(self, path: str) -> str:
+        return f"{self.base_url}/{path}"
+
+    def file_path(self, path: str) -> str:
+        """Ruta absoluta en disco; rechaza rutas que salgan de root"""
+        full_path = os.path.realpath(os.path.join(self.root, path))
+        if os.path.commonpath([self.root, full_path]) != self.root or full_path == self.root:
+            raise StorageError(400, f"Ruta no válida: {path}")
+        return full_path
+
+    def _open_temporary(self, full_path: str):
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        return tempfile.NamedTemporaryFile(dir=os.path.dirname(full_path), prefix=".upload-", delete=False)
+
+    async def upload(
+        self,
+        path: str,
+        content,
+        content_type: str,
+        content_length: Optional[int] = None,
+        timeout: Optional[float] = None
+    ) -> str:
+        full_path = self.file_path(path)
+        temporary = await run_in_threadpool(self._open_temporary, full_path)
+        try:
+            if isinstance(content, (bytes, bytearray)):
+                await run_in_threadpool(temporary.write, content)
+            else:
+                async for chunk in content:
+                    await run_in_threadpool(temporary.write, chunk)
+            await run_in_threadpool(temporary.close)
+            await run_in_threadpool(os.replace, temporary.name, full_path)
+        except BaseException:
+            temporary.close()
+            try:
+                os.unlink(temporary.name)
+            except FileNotFoundError:
+                pass
+            raise
+        return self.public_url(path)
+
+    async def download(self, path: str) -> bytes:
+        def read() -> bytes:
+            with open(self.file_path(path), "rb") as f:
+                return f.read()
+        try:
+            return await run_in_threadpool(read)
+        except FileNotFoundError:
+            raise StorageError(404, f"No existe {path}")
+
+    def _delete_files(self, paths: list[str]) -> None:
+        for path in paths:
+            try:
+                os.unlink(self.file_path(path))
+            except FileNotFoundError:
+                pass
+
+    async def delete(self, path: str) -> None:
+        await run_in_threadpool(self._delete_files, [path])
+
+    async def delete_many(self, paths: Iterable[str]) -> None:
+        paths = list(paths)
+        if paths:
+            await run_in_threadpool(self._delete_files, paths)
+
+    def _walk(self, prefix: str) -> list[tuple[str, Optional[datetime]]]:
+        objects = []
+        for directory, _, files in os.walk(os.path.join(self.root, prefix.strip("/"))):
+            for name in files:
+                if name.startswith(".upload-"):
+                    continue
+                full_path = os.path.join(directory, name)
+                created_at = datetime.fromtimestamp(os.stat(full_path).st_mtime, timezone.utc)
+                objects.append((os.path.relpath(full_path, self.root).replace(os.sep, "/"), created_at))
+        return objects
+
+    async def list_objects(self, prefix: str) -> AsyncIterator[tuple[str, Optional[datetime]]]:
+        for item in await run_in_threadpool(self._walk, prefix):
+            yield item
+
+STORAGE_BACKENDS = {
+    "supabase": SupabaseStorage,
+    "local": LocalStorage,
+}
+
+_storage: Optional[Storage] = None
+
+def get_storage() -> Storage:
+    """Almacenamiento compartido del worker; se crea en el arranque (ver lifespan)"""
+    global _storage
+    if _storage is None:
+        backend = os.getenv("STORAGE_BACKEND", "supabase").lower()
+        if backend not in STORAGE_BACKENDS:
+            raise ValueError(f"STORAGE_BACKEND desconocido: {backend}")
+        _storage = STORAGE_BACKENDS[backend].from_env()
+    return _storage
+
+async def close_storage() -> None:
+    global _storage
+    if _storage is not None:
+        await _storage.close()
+        _storage = None
@@ -0,0 +1,295 @@
+"""
+Exportación e importación de noticias en NDJSON (un objeto JSON por línea).
+
+- La exportación recorre la tabla con un cursor de servidor (yield_per) y
+  envía bloques de ~64 KB: la memoria no depende del tamaño de la tabla.
+- La importación procesa lotes de IMPORT_BATCH_SIZE filas, cada uno en su
+  transacción con un único INSERT ... ON CONFLICT sobre news.import_key
+  (índice único ux_news_import_key). La clave viene en el NDJSON o se
+  deriva de (title, date); las noticias sin clave con ese mismo título y
+  fecha la adoptan antes de insertar. Repetir una importación, o dos a la
+  vez, no duplica noticias (se omiten o se actualizan). Las noticias
+  creadas desde la API no tienen clave y no les afecta ninguna restricción.
+  El id no se importa porque es propio de cada entorno; el autor se
+  enlaza por author_email y, si no existe, por user_id.
+"""
+from datetime import datetime
+from typing import IO, Iterator, Optional
+from sqlalchemy import bindparam, func, or_, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from app.database import SessionLocal
+from app.models.news import News, author_columns, make_excerpt
+from app.models.user import User
+from app.core.invalidation import NEWS, publish
+from app.core.search import index_news_ids, search_dialect
+import hashlib
+import logging
+import os
+import uuid
+import orjson
+
+logger = logging.getLogger(__name__)
+
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+EXPORT_CHUNK_BYTES = 64 * 1024
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "1000"))
+IMPORT_MAX_LINE_BYTES = 1024 * 1024
+IMPORT_MAX_ERROR_SAMPLES = 20
+
+EXPORT_COLUMNS = (
+    News.id,
+    News.title,
+    News.subtitle,
+    News.image_url,
+    News.image_variants,
+    News.image_description,
+    News.body,
+    News.excerpt,
+    News.date,
+    News.updated_at,
+    News.user_id,
+    News.author_email,
+    News.import_key,
+)
+
+# Columnas de texto con longitud máxima: se validan antes de insertar
+_STRING_LIMITS = {
+    column.name: column.type.length
+    for column in News.__table__.columns
+    if getattr(column.type, "length", None)
+}
+
+def import_key(title: str, date: datetime) -> str:
+    """Clave por defecto de una noticia importada: su clave natural (title, date)"""
+    natural_key = f"{title}\x00{date.isoformat()}"
+    return hashlib.sha256(natural_key.encode("utf-8")).hexdigest()
+
+def export_ndjson(session_factory=SessionLocal) -> Iterator[bytes]:
+    """Generador síncrono (StreamingResponse lo itera en el threadpool)"""
+    db = session_factory()
+    try:
+        result = db.execute(
+            select(*EXPORT_COLUMNS)
+            .order_by(News.id)
+            .execution_options(stream_results=True, yield_per=EXPORT_BATCH_SIZE)
+        )
+        buffer = bytearray()
+        for row in result:
+            data = row._asdict()
+            if not data["import_key"] and data["title"] and data["date"]:
+                data["import_key"] = import_key(data["title"], data["date"])
+            buffer += orjson.dumps(data)
+            buffer += b"\n"
+            if len(buffer) >= EXPORT_CHUNK_BYTES:
+                yield bytes(buffer)
+                buffer.clear()
+        if buffer:
+            yield bytes(buffer)
+    finally:
+        db.close()
+
+class ImportStats:
+    def __init__(self):
+        self.lines = 0
+        self.inserted = 0
+        self.updated = 0
+        self.skipped = 0
+        self.errors = 0
+        self.error_samples: list[str] = []
+
+    def error(self, line_number: int, message: str) -> None:
+        self.errors += 1
+        if len(self.error_samples) < IMPORT_MAX_ERROR_SAMPLES:
+            self.error_samples.append(f"línea {line_number}: {message}")
+
+    def as_dict(self) -> dict:
+        return {
+            "lines": self.lines,
+            "inserted": self.inserted,
+            "updated": self.updated,
+            "skipped": self.skipped,
+            "errors": self.errors,
+        }
+
+def _parse_datetime(value) -> datetime:
+    parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    # Las fechas se guardan sin zona horaria (hora local del servidor)
+    return parsed.astimezone().replace(tzinfo=None) if parsed.tzinfo else parsed
+
+def parse_news_line(line: bytes) -> dict:
+    """Convierte una línea en los valores de una fila de news; ValueError si no es válida"""
+    try:
+        data = orjson.loads(line)
+    except orjson.JSONDecodeError as e:
+        raise ValueError(f"JSON inválido ({e})")
+    if not isinstance(data, dict):
+        raise ValueError("se esperaba un objeto JSON")
+    if not data.get("title") or not data.get("date"):
+        raise ValueError("faltan title o date")
+
+    body = data.get("body") or ""
+    row = {
+        "title": str(data["title"]).strip(),
+        "subtitle": data.get("subtitle") or "",
+        "image_url": data.get("image_url"),
+        "image_variants": data.get("image_variants"),
+        "image_description": data.get("image_description") or "",
+        "body": body,
+        "excerpt": data.get("excerpt") or make_excerpt(body),
+        "date": _parse_datetime(data["date"]),
+        "user_id": uuid.UUID(str(data["user_id"])) if data.get("user_id") else None,
+        "author_email": data.get("author_email"),
+    }
+    row["updated_at"] = _parse_datetime(data["updated_at"]) if data.get("updated_at") else row["date"]
+    row["import_key"] = str(data.get("import_key") or import_key(row["title"], row["date"]))
+    for name, length in _STRING_LIMITS.items():
+        if row.get(name) is not None and len(row[name]) > length:
+            raise ValueError(f"{name} supera {length} caracteres")
+    return row
+
+def _resolve_authors(db: Session, rows: list[dict]) -> None:
+    """
+    Sustituye author_email / user_id por un usuario que exista aquí y
+    rellena la copia del autor (author_*) con sus datos actuales
+    """
+    emails = {row["author_email"] for row in rows if row["author_email"]}
+    user_ids = {row["user_id"] for row in rows if row["user_id"]}
+    by_email, by_id = {}, {}
+    if emails or user_ids:
+        for user in db.execute(
+            select(User.id, User.email, User.first_name, User.last_name)
+            .where(or_(User.email.in_(emails), User.id.in_(user_ids)))
+        ):
+            by_email[user.email] = user
+            by_id[user.id] = user
+    for row in rows:
+        user = by_email.get(row["author_email"]) or by_id.get(row["user_id"])
+        row["user_id"] = user.id if user else None
+        row.update(author_columns(user))
+
+def _adopt_existing(db: Session, rows: list[dict]) -> None:
+    """
+    Asigna la clave a una noticia sin import_key con el mismo (title, date),
+    p. ej. una creada desde la API y exportada: así no se duplica al importar
+    """
+    keys = [row["import_key"] for row in rows]
+    present = set(db.scalars(select(News.import_key).where(News.import_key.in_(keys))))
+    missing = [row for row in rows if row["import_key"] not in present]
+    if not missing:
+        return
+    # Sobre la tabla (Core): un executemany por filas, sin onupdate en updated_at
+    news = News.__table__
+    candidate = select(func.min(news.c.id))\
+        .where(news.c.title == bindparam("key_title"), news.c.date == bindparam("key_date"), news.c.import_key.is_(None))\
+        .scalar_subquery()
+    db.execute(
+        update(news)
+        .where(news.c.id == candidate)
+        .values(import_key=bindparam("key"), updated_at=news.c.updated_at),
+        [{"key_title": row["title"], "key_date": row["date"], "key": row["import_key"]} for row in missing]
+    )
+
+def _upsert(db: Session, rows: list[dict], on_conflict: str):
+    """INSERT ... ON CONFLICT (import_key) DO NOTHING / DO UPDATE ... RETURNING id"""
+    dialect = search_dialect(db)
+    if dialect == "postgresql":
+        statement = postgresql.insert(News)
+    elif dialect == "sqlite":
+        statement = sqlite.insert(News)
+    else:
+        raise RuntimeError(f"La importación no admite el dialecto {dialect}")
+    if on_conflict == "update":
+        statement = statement.on_conflict_do_update(
+            index_elements=["import_key"],
+            set_={name: statement.excluded[name] for name in rows[0] if name != "import_key"},
+        )
+    else:
+        statement = statement.on_conflict_do_nothing(index_elements=["import_key"])
+    return db.scalars(statement.returning(News.id), rows).all()
+
+def write_batch(rows: list[dict], on_conflict: str, stats: ImportStats) -> None:
+    """Inserta (o actualiza) un lote en una transacción"""
+    # Dentro del lote, la última aparición de cada clave gana
+    unique = {row["import_key"]: row for row in rows}
+    stats.skipped += len(rows) - len(unique)
+
+    db = SessionLocal()
+    try:
+        rows = list(unique.values())
+        _resolve_authors(db, rows)
+        _adopt_existing(db, rows)
+        # Solo para las estadísticas: el índice único decide qué se inserta
+        existing = db.scalar(
+            select(func.count()).select_from(News).where(News.import_key.in_(list(unique)))
+        ) if on_conflict == "update" else 0
+
+        changed_ids = _upsert(db, rows, on_conflict)
+        if on_conflict == "update":
+            updated = min(existing, len(changed_ids))
+            stats.updated += updated
+            stats.inserted += len(changed_ids) - updated
+        else:
+            stats.inserted += len(changed_ids)
+            stats.skipped += len(rows) - len(changed_ids)
+
+        index_news_ids(db, changed_ids)
+        if changed_ids:
+            publish(db, NEWS)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+def _read_lines(file: IO[bytes]) -> Iterator[tuple[int, Optional[bytes]]]:
+    """(número, línea) o (número, None) si la línea supera IMPORT_MAX_LINE_BYTES"""
+    line_number = 0
+    while True:
+        line = file.readline(IMPORT_MAX_LINE_BYTES + 1)
+        if not line:
+            return
+        line_number += 1
+        if len(line) > IMPORT_MAX_LINE_BYTES and not line.endswith(b"\n"):
+            # Descartar el resto de la línea sin cargarla entera en memoria
+            while line and not line.endswith(b"\n"):
+                line = file.readline(IMPORT_MAX_LINE_BYTES)
+            yield line_number, None
+        else:
+            yield line_number, line
+
+def import_ndjson(file: IO[bytes], on_conflict: str = "skip") -> Iterator[bytes]:
+    """
+    Importa el NDJSON de file y produce una línea de progreso por lote,
+    que además mantiene viva la conexión en importaciones largas.
+    Si un lote falla se detiene: los anteriores ya están confirmados y
+    repetir la importación es seguro.
+    """
+    stats = ImportStats()
+    batch: list[dict] = []
+    try:
+        for line_number, line in _read_lines(file):
+            if line is None:
+                stats.lines += 1
+                stats.error(line_number, "línea demasiado larga")
+                continue
+            if not line.strip():
+                continue
+            stats.lines += 1
+            try:
+                batch.append(parse_news_line(line))
+            except (ValueError, TypeError) as e:
+                stats.error(line_number, str(e))
+            if len(batch) >= IMPORT_BATCH_SIZE:
+                write_batch(batch, on_conflict, stats)
+                batch = []
+                yield orjson.dumps(stats.as_dict()) + b"\n"
+        if batch:
+            write_batch(batch, on_conflict, stats)
+        yield orjson.dumps({**stats.as_dict(), "done": True, "error_samples": stats.error_samples}) + b"\n"
+    except Exception as e:
+        logger.error(f"Importación interrumpida: {str(e)}", exc_info=True)
+        yield orjson.dumps({**stats.as_dict(), "done": False, "error": "Error al guardar un lote; la importación se detuvo"}) + b"\n"
+    finally:
+        file.close()
@@ -0,0 +1,77 @@
+from fastapi import UploadFile
+from typing import AsyncIterator, Optional
+import os
+
+ALLOWED_IMAGE_TYPES = ["image/jpeg", "image/png", "image/webp", "image/gif"]
+MAX_IMAGE_SIZE = 5 * 1024 * 1024  # 5MB
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(64 * 1024)))
+
+class InvalidImageType(Exception):
+    """El tipo declarado o los bytes iniciales no son de una imagen permitida"""
+
+class ImageTooLarge(Exception):
+    """La imagen supera MAX_IMAGE_SIZE"""
+
+def sniff_image_type(head: bytes) -> Optional[str]:
+    """Tipo real de la imagen según sus primeros bytes (magic numbers)"""
+    if head.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if head.startswith((b"GIF87a", b"GIF89a")):
+        return "image/gif"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    return None
+
+class ImageStream:
+    """
+    Imagen validada lista para enviarse por trozos.
+    El tipo se comprueba con el primer trozo y el tamaño se va sumando:
+    en cuanto pasa del límite se aborta la subida con ImageTooLarge.
+    Nunca se guarda en memoria más de un trozo.
+    """
+
+    def __init__(self, image: UploadFile, content_type: str, first_chunk: bytes, max_size: int, chunk_size: int):
+        self.image = image
+        self.content_type = content_type
+        self.size = getattr(image, "size", None)
+        self.max_size = max_size
+        self.chunk_size = chunk_size
+        self._first_chunk = first_chunk
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        chunk = self._first_chunk
+        self._first_chunk = b""
+        total = 0
+        while chunk:
+            total += len(chunk)
+            if total > self.max_size:
+                raise ImageTooLarge()
+            yield chunk
+            chunk = await self.image.read(self.chunk_size)
+
+async def open_image_stream(
+    image: UploadFile,
+    max_size: int = MAX_IMAGE_SIZE,
+    chunk_size: int = UPLOAD_CHUNK_SIZE
+) -> ImageStream:
+    """Valida tipo y tamaño conocido antes de leer el archivo completo"""
+    if image.content_type not in ALLOWED_IMAGE_TYPES:
+        raise InvalidImageType()
+    # Starlette conoce el tamaño del archivo recibido: rechazar sin leerlo
+    if getattr(image, "size", None) is not None and image.size > max_size:
+        raise ImageTooLarge()
+
+    await image.seek(0)
+    first_chunk = await image.read(chunk_size)
+    sniffed = sniff_image_type(first_chunk[:16])
+    if sniffed is None or sniffed not in ALLOWED_IMAGE_TYPES:
+        raise InvalidImageType()
+    if len(first_chunk) > max_size:
+        raise ImageTooLarge()
+    # Se usa el tipo detectado, no el declarado por el cliente
+    return ImageStream(image, sniffed, first_chunk, max_size, chunk_size)
+
+def image_extension(image: UploadFile, content_type: str) -> str:
+    return os.path.splitext(image.filename or "")[1].lower() or f".{content_type.split('/')[1]}"
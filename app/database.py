@@ -1,22 +1,209 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, exc
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import QueuePool
 from dotenv import load_dotenv
+from fastapi import Request
+from typing import Optional
+import hashlib
 import os
+import threading
+import time
 
 load_dotenv()
 
 SUPABASE_DATABASE_URL = os.getenv("DATABASE_URL")
+# Réplica de solo lectura opcional para los GET (ver get_read_db)
+DATABASE_REPLICA_URL = os.getenv("DATABASE_REPLICA_URL")
 
-engine = create_engine(SUPABASE_DATABASE_URL)
+def _env_flag(name: str, default: str = "false") -> bool:
+    return os.getenv(name, default).lower() in ("1", "true", "yes")
+
+# Ajustar al número de workers de uvicorn: el total (workers * (size + overflow))
+# no debe superar el límite de conexiones del pooler de Supabase
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "5"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = _env_flag("DB_POOL_PRE_PING", "true")
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "15000"))
+# Tras escribir, las lecturas del mismo usuario van al primario durante
+# este tiempo para no ver datos anteriores por el retraso de la réplica
+REPLICA_STICKY_SECONDS = float(os.getenv("REPLICA_STICKY_SECONDS", "5"))
+# Pooler en modo transacción (Supavisor :6543, PgBouncer): sin sentencias
+# preparadas en el servidor ni parámetros de sesión
+DB_TRANSACTION_POOLER = _env_flag("DB_TRANSACTION_POOLER")
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool que mide cuánto espera cada checkout por una conexión libre"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self.checkouts = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.timeouts = 0
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            with self._stats_lock:
+                self.timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            with self._stats_lock:
+                self.checkouts += 1
+                self.wait_seconds += waited
+                self.max_wait_seconds = max(self.max_wait_seconds, waited)
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return {
+                "size": self.size(),
+                "checked_out": self.checkedout(),
+                "checked_in": self.checkedin(),
+                "overflow": max(0, self.overflow()),
+                "max_overflow": self._max_overflow,
+                "timeout": self._timeout,
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "avg_wait_ms": round(self.wait_seconds / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+                "max_wait_ms": round(self.max_wait_seconds * 1000, 3),
+            }
+
+def engine_options(url: str) -> dict:
+    """Argumentos de create_engine según el driver y las variables DB_*"""
+    parsed = make_url(url)
+    options = {"pool_pre_ping": DB_POOL_PRE_PING}
+    if parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:"):
+        # SQLite en memoria usa su propio pool de una conexión
+        return options
+
+    options.update(
+        poolclass=InstrumentedQueuePool,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+    )
+    if parsed.get_backend_name() != "postgresql":
+        return options
+
+    connect_args = {}
+    if DB_TRANSACTION_POOLER:
+        if parsed.get_driver_name() == "psycopg":
+            connect_args["prepare_threshold"] = None
+        # psycopg2 no prepara sentencias en el servidor
+    elif DB_STATEMENT_TIMEOUT_MS:
+        connect_args["options"] = f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"
+    options["connect_args"] = connect_args
+    return options
+
+engine = create_engine(SUPABASE_DATABASE_URL, **engine_options(SUPABASE_DATABASE_URL))
+replica_engine = (
+    create_engine(DATABASE_REPLICA_URL, **engine_options(DATABASE_REPLICA_URL))
+    if DATABASE_REPLICA_URL else None
+)
+
+if DB_TRANSACTION_POOLER and DB_STATEMENT_TIMEOUT_MS and engine.dialect.name == "postgresql":
+    # El pooler no reenvía parámetros de arranque: el timeout se fija por transacción
+    @event.listens_for(engine, "begin")
+    def _set_statement_timeout(conn):
+        conn.exec_driver_sql(f"SET LOCAL statement_timeout = {DB_STATEMENT_TIMEOUT_MS}")
+
+def _pool_stats(pool) -> dict:
+    if isinstance(pool, InstrumentedQueuePool):
+        stats = pool.stats()
+    else:
+        stats = {"status": pool.status()}
+    stats["pool_class"] = type(pool).__name__
+    return stats
+
+def pool_stats() -> dict:
+    stats = _pool_stats(engine.pool)
+    stats.update(
+        pre_ping=DB_POOL_PRE_PING,
+        recycle=DB_POOL_RECYCLE,
+        statement_timeout_ms=DB_STATEMENT_TIMEOUT_MS,
+        transaction_pooler=DB_TRANSACTION_POOLER,
+    )
+    if replica_engine is not None:
+        stats["replica"] = _pool_stats(replica_engine.pool)
+    return stats
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReplicaSessionLocal = (
+    sessionmaker(autocommit=False, autoflush=False, bind=replica_engine)
+    if replica_engine is not None else None
+)
 
 Base = declarative_base()
 
-def get_db():
+# Clientes que acaban de escribir -> instante hasta el que leen del primario
+_sticky_until: dict[str, float] = {}
+_sticky_lock = threading.Lock()
+
+def sticky_key(request: Request) -> Optional[str]:
+    """Identifica al cliente por su token sin guardarlo en claro"""
+    authorization = request.headers.get("authorization")
+    if not authorization:
+        return None
+    return hashlib.blake2b(authorization.encode("utf-8"), digest_size=16).hexdigest()
+
+def is_sticky(key: Optional[str]) -> bool:
+    if key is None:
+        return False
+    with _sticky_lock:
+        until = _sticky_until.get(key)
+        if until is None:
+            return False
+        if until < time.monotonic():
+            del _sticky_until[key]
+            return False
+        return True
+
+@event.listens_for(SessionLocal, "after_commit")
+def _stick_to_primary(session):
+    # Se marca en el commit, antes de responder: la siguiente lectura ya lo ve
+    key = session.info.get("sticky_key")
+    if key is None or replica_engine is None:
+        return
+    now = time.monotonic()
+    with _sticky_lock:
+        _sticky_until[key] = now + REPLICA_STICKY_SECONDS
+        if len(_sticky_until) > 10000:
+            for expired in [k for k, until in _sticky_until.items() if until < now]:
+                del _sticky_until[expired]
+
+def uses_replica(db: Session) -> bool:
+    return replica_engine is not None and db.get_bind() is replica_engine
+
+def get_db(request: Request):
     db = SessionLocal()
+    db.info["sticky_key"] = sticky_key(request)
+    try:
+        yield db
+    finally:
+        db.close()
+
+def get_read_db(request: Request):
+    """
+    Sesión para endpoints de solo lectura: usa la réplica si está
+    configurada, salvo que este cliente haya escrito hace menos de
+    REPLICA_STICKY_SECONDS (en este worker).
+    """
+    key = sticky_key(request)
+    if ReplicaSessionLocal is None or is_sticky(key):
+        db = SessionLocal()
+        db.info["sticky_key"] = key
+    else:
+        db = ReplicaSessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
@@ -1,18 +1,48 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from .routes import news, auth, users
-from .database import Base, engine
-from fastapi.staticfiles import StaticFiles
+from .routes import news, auth, users, internal, media
+from contextlib import asynccontextmanager
+from .core.hashing import password_pool
+from .core.images import shutdown_image_pool
+from .core.storage import close_storage, get_storage
+from .core.jobs import job_worker
+from .core.invalidation import invalidation_listener
+from .core.metrics import MetricsMiddleware
+from .core.compression import CompressedStaticFiles, CompressionMiddleware
+from .core.logs import log_pipeline
+import logging
 import os
 from dotenv import load_dotenv
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 static_dir = os.path.join(os.path.dirname(__file__), "..", "static")
 
-Base.metadata.create_all(bind=engine)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Importar la app no toca la red ni la base de datos: todo lo que abre
+    # conexiones o procesos se crea aquí o la primera vez que se usa.
+    # El esquema lo crea create_db.py en el despliegue, no el arranque.
+    # Logging por cola: los handlers escriben desde un hilo propio
+    log_pipeline.start()
+    logger.info("Orígenes permitidos: %s", allowed_origins)
+    # Un único almacenamiento por worker (STORAGE_BACKEND), con conexiones reutilizables
+    get_storage()
+    # Cola de trabajos persistente: borrados en Storage, variantes, barrido
+    job_worker.start()
+    # Eventos de invalidación de los demás workers (LISTEN o sondeo)
+    invalidation_listener.start()
+    yield
+    invalidation_listener.stop()
+    await job_worker.stop()
+    await close_storage()
+    password_pool.shutdown()
+    shutdown_image_pool()
+    log_pipeline.stop()
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # Orígenes base fijos + variables de entorno
 base_origins = [
@@ -35,17 +65,24 @@ allowed_origins = list(set(
     [origin for origin in env_origins if origin is not None]
 ))
 
-print(f"🌐 Allowed origins: {allowed_origins}")
-
 app.add_middleware(
     CORSMiddleware,
     allow_origins=allowed_origins,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
+# gzip / brotli según Accept-Encoding (el feed y los estáticos llegan ya comprimidos)
+app.add_middleware(CompressionMiddleware)
+# Último en añadirse = el más externo: mide también CORS y los errores
+app.add_middleware(MetricsMiddleware)
 
-app.mount("/static", StaticFiles(directory=static_dir), name="static")
+app.mount("/static", CompressedStaticFiles(directory=static_dir), name="static")
 app.include_router(auth.router, prefix="/auth")
 app.include_router(users.router, prefix="/users")
-app.include_router(news.router, prefix="/api")
\ No newline at end of file
+app.include_router(news.router, prefix="/api")
+app.include_router(internal.router, prefix="/internal")
+app.include_router(internal.metrics_router)
+# Imágenes de STORAGE_BACKEND=local (con Supabase responde 404)
+app.include_router(media.router, prefix="/media")
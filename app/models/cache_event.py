@@ -0,0 +1,17 @@
+from sqlalchemy import Column, Integer, String, Float, Index
+from app.database import Base
+
+class CacheEvent(Base):
+    """Cambio publicado para invalidar las cachés de otros workers (ver app.core.invalidation)"""
+    __tablename__ = "cache_events"
+
+    id = Column(Integer, primary_key=True, index=True)
+    entity = Column(String(20), nullable=False)
+    entity_id = Column(String(64))
+    origin = Column(String(32), nullable=False)
+    version = Column(Integer, nullable=False)
+    published_at = Column(Float, nullable=False)
+
+    __table_args__ = (
+        Index("ix_cache_events_published_at", published_at),
+    )
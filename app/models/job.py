@@ -0,0 +1,22 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, JSON, Index
+from app.database import Base
+from datetime import datetime
+
+class Job(Base):
+    """Trabajo en segundo plano persistido en la base de datos (ver app.core.jobs)"""
+    __tablename__ = "jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String(50), nullable=False)
+    payload = Column(JSON)
+    status = Column(String(20), default="pending", nullable=False)  # pending | running | done | failed
+    attempts = Column(Integer, default=0, nullable=False)
+    max_attempts = Column(Integer, default=8, nullable=False)
+    run_after = Column(DateTime, default=datetime.now, nullable=False)
+    last_error = Column(Text)
+    created_at = Column(DateTime, default=datetime.now)
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+
+    __table_args__ = (
+        Index("ix_jobs_status_run_after", status, run_after),
+    )
@@ -1,7 +1,29 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Index, JSON
 from sqlalchemy.orm import relationship
 from sqlalchemy.dialects.postgresql import UUID
 from app.database import Base
+from datetime import datetime
+
+EXCERPT_LENGTH = 280
+
+def make_excerpt(body: str, length: int = EXCERPT_LENGTH) -> str:
+    """Resumen corto del cuerpo, cortado en un límite de palabra"""
+    text = " ".join((body or "").split())
+    if len(text) <= length:
+        return text
+    cut = text[:length].rsplit(" ", 1)[0]
+    return cut.rstrip(",.;:") + "…"
+
+def author_columns(user) -> dict:
+    """
+    Valores de las columnas author_* para las noticias de user (o sin autor).
+    Sirve tanto para News(**...) como para query.update(...).
+    """
+    return {
+        "author_first_name": user.first_name if user else None,
+        "author_last_name": user.last_name if user else None,
+        "author_email": user.email if user else None,
+    }
 
 class News(Base):
     __tablename__ = "news"
@@ -10,10 +32,33 @@ class News(Base):
     title = Column(String(100))
     subtitle = Column(String(200))
     image_url = Column(String(200))
+    image_variants = Column(JSON)  # [{"width", "format", "url"}], ver app.core.images
     image_description = Column(String(200))
     body = Column(Text)
-    date = Column(DateTime)
+    excerpt = Column(String(300))  # Calculado al escribir, ver make_excerpt
+    # Obligatoria: es la clave de la paginación por cursor (ver app.core.pagination)
+    date = Column(DateTime, nullable=False, default=datetime.now)
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
     user_id = Column(UUID(as_uuid=True), ForeignKey('users.id', ondelete="SET NULL"), nullable=True)
+    # Copia del autor: el feed público se lee sin JOIN con users. Se mantiene
+    # al crear noticias y al editar o borrar usuarios (ver author_columns);
+    # create_db.py --rebuild-authors la regenera desde users.
+    author_first_name = Column(String(50))
+    author_last_name = Column(String(50))
+    author_email = Column(String(100))
+    # Clave de la importación NDJSON (ver app.core.transfer.import_key);
+    # NULL en las noticias creadas desde la API
+    import_key = Column(String(64))
     
     # Relación con User
-    user = relationship("User", backref="news")
\ No newline at end of file
+    user = relationship("User", backref="news")
+
+    # Índices para la paginación por cursor (date, id)
+    __table_args__ = (
+        Index("ix_news_date_id", date.desc(), id.desc()),
+        Index("ix_news_user_id_date", user_id, date.desc()),
+        # INSERT ... ON CONFLICT de la importación; admite varios NULL
+        Index("ux_news_import_key", import_key, unique=True),
+        # La importación adopta por (title, date) las noticias sin import_key
+        Index("ix_news_title_date", title, date),
+    )
\ No newline at end of file
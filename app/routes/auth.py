@@ -12,14 +12,19 @@ from app.schemas.user import (
 from app.core.security import get_password_hash, verify_password, create_access_token, verify_token
 from app.models.user import User as UserModel 
 from fastapi import Depends, HTTPException
-from app.core.security import logger
+import logging
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(tags=["auth"])
 
+# Los endpoints son síncronos (def) porque usan la Session síncrona de SQLAlchemy:
+# FastAPI los ejecuta en el threadpool y no bloquean el event loop.
+
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
 @router.post("/register", response_model=UserSchema)
-async def register_user(
+def register_user(
     user_data: UserCreate,
     db: Session = Depends(get_db)
 ):
@@ -66,18 +71,19 @@ async def register_user(
         )
 
 @router.post("/login", response_model=Token)
-async def login_user(
+def login_user(
     form_data: OAuth2PasswordRequestForm = Depends(),
     db: Session = Depends(get_db)
 ):
     user = db.query(UserModel).filter(UserModel.email == form_data.username).first()
-    print(f"Usuario encontrado en DB: {user.email}, Rol: {user.role}")  # Debug
     if not user or not verify_password(form_data.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    # Una línea por login: muestreable con LOG_SAMPLING="app.routes.auth=..."
+    logger.info("Login: %s (role %s)", user.id, user.role)
     
     access_token = create_access_token(
         data={
@@ -102,7 +108,7 @@ async def login_user(
     }
 
 @router.get("/verify")
-async def verify_token_endpoint(
+def verify_token_endpoint(
     token: str = Depends(oauth2_scheme),
     db: Session = Depends(get_db)
 ):
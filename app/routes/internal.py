@@ -0,0 +1,98 @@
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from app.core.cache import cache_stats, get_news_version
+from app.core.hashing import password_pool
+from app.core.invalidation import invalidation_listener
+from app.core.logs import log_pipeline
+from app.core.jobs import job_counts
+from app.core.metrics import Counter, Gauge, registry
+from app.core.security import require_admin
+from app.database import pool_stats
+from dotenv import load_dotenv
+import hmac
+import os
+
+load_dotenv()
+
+# Token fijo para el scraper de Prometheus (Authorization: Bearer ...).
+# Sin él /metrics responde 404, salvo METRICS_PUBLIC=1 (red ya restringida).
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+METRICS_PUBLIC = os.getenv("METRICS_PUBLIC", "false").lower() in ("1", "true", "yes")
+
+def require_metrics_token(request: Request) -> None:
+    if not METRICS_TOKEN:
+        if METRICS_PUBLIC:
+            return
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not hmac.compare_digest(token.encode(), METRICS_TOKEN.encode()):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid metrics token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+router = APIRouter(tags=["internal"], dependencies=[Depends(require_admin)])
+# /metrics va aparte: un JWT de usuario caduca cada pocos minutos y no sirve al scraper
+metrics_router = APIRouter(tags=["internal"], dependencies=[Depends(require_metrics_token)])
+
+# Estadísticas de las cachés en memoria (por worker)
+@router.get("/cache")
+def read_cache_stats():
+    return {
+        "news_version": get_news_version(),
+        "caches": cache_stats(),
+        "invalidation": invalidation_listener.stats()
+    }
+
+# Pool de bcrypt: ocupación, rechazos y tiempos por operación
+@router.get("/passwords")
+def read_password_pool_stats():
+    return password_pool.snapshot()
+
+# Trabajos en cola por tipo y estado
+@router.get("/jobs")
+def read_job_counts():
+    return job_counts()
+
+# Pool de conexiones a la base de datos (por worker)
+@router.get("/db-pool")
+def read_db_pool_stats():
+    return pool_stats()
+
+@registry.collector
+def runtime_metrics():
+    """Estado de pools y cachés, leído en el momento de servir /metrics"""
+    db_pool = Gauge("db_pool_connections", "Conexiones del pool de base de datos", ("engine", "state"))
+    stats = pool_stats()
+    for engine_name, engine_stats in (("primary", stats), ("replica", stats.get("replica"))):
+        if engine_stats and "checked_out" in engine_stats:
+            db_pool.set(engine_name, "checked_out", value=engine_stats["checked_out"])
+            db_pool.set(engine_name, "checked_in", value=engine_stats["checked_in"])
+            db_pool.set(engine_name, "overflow", value=engine_stats["overflow"])
+    db_timeouts = Counter("db_pool_timeouts_total", "Checkouts que agotaron DB_POOL_TIMEOUT", ("engine",))
+    db_timeouts.inc("primary", amount=stats.get("timeouts", 0))
+
+    passwords = password_pool.snapshot()
+    password_in_flight = Gauge("password_pool_in_flight", "Operaciones bcrypt admitidas")
+    password_in_flight.set(value=passwords["in_flight"])
+    password_rejected = Counter("password_pool_rejected_total", "Operaciones bcrypt rechazadas (503)", ("reason",))
+    password_rejected.inc("saturated", amount=passwords["rejected"])
+    password_rejected.inc("timeout", amount=passwords["timeouts"])
+
+    cache_events = Counter("cache_events_total", "Aciertos, fallos y expulsiones por caché", ("cache", "event"))
+    for cache in cache_stats():
+        for event in ("hits", "misses", "evictions", "expirations"):
+            cache_events.inc(cache["name"], event, amount=cache[event])
+
+    logs = log_pipeline.stats()
+    log_queue = Gauge("log_queue_records", "Registros de log pendientes de escribir")
+    log_queue.set(value=logs["queued"])
+    log_discarded = Counter("log_records_discarded_total", "Registros de log no escritos", ("reason",))
+    log_discarded.inc("queue_full", amount=logs["dropped"])
+    log_discarded.inc("sampled", amount=logs["sampled_out"])
+    return [db_pool, db_timeouts, password_in_flight, password_rejected, cache_events, log_queue, log_discarded]
+
+# Métricas en formato de texto de Prometheus
+@metrics_router.get("/metrics")
+def read_metrics():
+    return Response(content=registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
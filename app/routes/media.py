@@ -0,0 +1,39 @@
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse
+from app.core.http_cache import is_not_modified, not_modified
+from app.core.storage import LocalStorage, StorageError, get_storage
+from datetime import datetime
+import os
+import stat
+
+router = APIRouter(tags=["media"])
+
+# Los nombres llevan un uuid y no se reescriben: se pueden cachear para siempre
+MEDIA_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# Imágenes del almacenamiento local. FileResponse envía el fichero con
+# sendfile cuando el servidor lo soporta y atiende peticiones Range.
+@router.api_route("/{path:path}", methods=["GET", "HEAD"])
+async def read_media(path: str, request: Request):
+    storage = get_storage()
+    if not isinstance(storage, LocalStorage):
+        # Con Supabase las imágenes se sirven desde su CDN
+        raise HTTPException(status_code=404, detail="Archivo no encontrado")
+    try:
+        file_path = storage.file_path(path)
+    except StorageError:
+        raise HTTPException(status_code=404, detail="Archivo no encontrado")
+    try:
+        stat_result = await run_in_threadpool(os.stat, file_path)
+    except FileNotFoundError:
+        stat_result = None
+    if stat_result is None or not stat.S_ISREG(stat_result.st_mode) or os.path.basename(file_path).startswith("."):
+        raise HTTPException(status_code=404, detail="Archivo no encontrado")
+
+    # Con stat_result FileResponse calcula ETag y Last-Modified sin volver al disco
+    response = FileResponse(file_path, stat_result=stat_result, headers={"Cache-Control": MEDIA_CACHE_CONTROL})
+    etag = response.headers["etag"]
+    if is_not_modified(request, etag, datetime.fromtimestamp(stat_result.st_mtime)):
+        return not_modified({"ETag": etag, "Cache-Control": MEDIA_CACHE_CONTROL})
+    return response
@@ -1,97 +1,207 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Security, Form, Request
-from fastapi import status, Query
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Request
+from fastapi import status, Query, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from app.models.news import News as NewsModel
+from app.models.news import News as NewsModel, author_columns, make_excerpt
 from app.models.user import User
-from app.schemas.news import NewsResponse
-from app.database import get_db
-from app.core.security import get_current_active_user
+from app.schemas.news import NewsResponse, NewsSearchResult, NewsSummary
+from app.database import REPLICA_STICKY_SECONDS, SessionLocal, get_db, get_read_db, uses_replica
+from app.core.security import get_current_active_user, require_admin
+from app.core.cache import (
+    FeedSnapshot,
+    NewsItemSnapshot,
+    get_news_version,
+    changed_recently,
+    get_news_version_changed_at,
+    news_item_cache,
+    news_item_key,
+    public_feed_cache,
+)
+from app.core.compression import COMPRESSION_MIN_SIZE, choose_encoding, encode_snapshot, weak_etag
+from app.core.http_cache import is_not_modified, make_etag, not_modified, validator_headers
+from app.core.invalidation import NEWS, publish
+from app.core.images import IMAGE_VARIANTS_JOB, render_variants_async, variant_path
+from app.core.jobs import STORAGE_DELETE, enqueue, enqueue_now, enqueue_storage_delete, job_handler, job_worker
+from app.core.storage import StorageError, get_storage
+from app.core.uploads import (
+    MAX_IMAGE_SIZE,
+    ImageTooLarge,
+    InvalidImageType,
+    image_extension,
+    open_image_stream,
+)
+from app.core.pagination import CURSOR_HEADER, apply_keyset, clamp_limit, split_page
+from app.core.search import index_news, search_news, unindex_news
+from app.core.transfer import export_ndjson, import_ndjson
 from datetime import datetime
 import os
-from fastapi.security import OAuth2PasswordBearer
-from supabase import create_client, Client
-from typing import List
+from fastapi.concurrency import run_in_threadpool
+from typing import List, Optional, Union
 import uuid
+import asyncio
 import logging
-from urllib.parse import urljoin
+import tempfile
 from app.models.user import User as UserModel
 from app.models.news import News
-import httpx
-from sqlalchemy.orm import joinedload
+import orjson
+from sqlalchemy.orm import load_only
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 router = APIRouter()
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 MAX_LIMIT = 100
 
-async def require_admin(
-    current_user: User = Security(get_current_active_user, scopes=["admin"])
-):
-    return current_user
+SUMMARY_COLUMNS = (
+    NewsModel.id,
+    NewsModel.title,
+    NewsModel.subtitle,
+    NewsModel.image_url,
+    NewsModel.image_variants,
+    NewsModel.image_description,
+    NewsModel.excerpt,
+    NewsModel.date,
+    NewsModel.updated_at,
+    NewsModel.user_id,
+    NewsModel.author_first_name,
+    NewsModel.author_last_name,
+    NewsModel.author_email,
+)
 
-def get_supabase_client(token: str = None) -> Client:
-    """Crea y configura el cliente Supabase"""
-    supabase_url = os.getenv("SUPABASE_URL")
-    supabase_key = os.getenv("SUPABASE_KEY")
-    
-    if not supabase_url or not supabase_key:
-        logger.error("Supabase URL or KEY not configured")
-        raise HTTPException(
-            status_code=500,
-            detail="Server configuration error"
-        )
-    
-    client = create_client(supabase_url, supabase_key)
-    
-    if token:
-        try:
-            # Configura el token de autenticación
-            client.postgrest.auth(token)
-        except Exception as auth_error:
-            logger.error(f"Supabase auth error: {str(auth_error)}")
-            raise HTTPException(
-                status_code=401,
-                detail="Authentication error"
-            )
-    
-    return client
+def apply_fields(query, fields: Optional[str]):
+    """Con fields=summary solo se leen las columnas del resumen (sin body)"""
+    if fields == "summary":
+        query = query.options(load_only(*SUMMARY_COLUMNS))
+    return query
 
-@router.get("/news/public/", response_model=List[NewsResponse])
-def read_public_news(db: Session = Depends(get_db)):
-    try:
-        # Obtener TODAS las noticias sin paginación
-        news_list = db.query(NewsModel)\
-            .options(joinedload(NewsModel.user))\
-            .order_by(NewsModel.date.desc())\
-            .all()
-        
-        response = []
-        for news_item in news_list:
+def author_info(news_item: News) -> Optional[dict]:
+    # Desde la copia del autor en la propia noticia: sin JOIN con users
+    if news_item.user_id is None or news_item.author_email is None:
+        return None
+    return {
+        "id": news_item.user_id,
+        "first_name": news_item.author_first_name,
+        "last_name": news_item.author_last_name,
+        "email": news_item.author_email
+    }
+
+def news_response_dict(news_item: News) -> dict:
+    """Noticia completa con los campos en el orden de NewsResponse"""
+    return {
+        "title": news_item.title,
+        "subtitle": news_item.subtitle,
+        "image_description": news_item.image_description,
+        "body": news_item.body,
+        "id": news_item.id,
+        "image_url": news_item.image_url,
+        "date": news_item.date,
+        "user_id": news_item.user_id,
+        "author": author_info(news_item),
+        "image_variants": news_item.image_variants
+    }
+
+def build_public_feed(
+    db: Session,
+    cursor: Optional[str],
+    limit: Optional[int],
+    fields: Optional[str],
+    changed_at: Optional[datetime]
+) -> FeedSnapshot:
+    """
+    Consulta el feed público y lo serializa una sola vez a bytes JSON.
+    Los diccionarios siguen el orden de campos de NewsResponse/NewsSummary,
+    así la respuesta es idéntica a la que generaría response_model.
+    """
+    query = apply_fields(db.query(NewsModel), fields)
+    next_token = None
+
+    if cursor is None and limit is None:
+        # Sin parámetros se mantiene el comportamiento original (todas las noticias)
+        news_list = query.order_by(NewsModel.date.desc()).all()
+    else:
+        # Paginación por cursor: cada página cuesta lo mismo que la primera
+        page_size = clamp_limit(limit, MAX_LIMIT, MAX_LIMIT)
+        rows = apply_keyset(query, NewsModel, cursor).limit(page_size + 1).all()
+        news_list, next_token = split_page(rows, page_size)
+    
+    result = []
+    for news_item in news_list:
+        if fields == "summary":
             news_dict = {
                 "id": news_item.id,
                 "title": news_item.title,
                 "subtitle": news_item.subtitle,
                 "image_url": news_item.image_url,
                 "image_description": news_item.image_description,
-                "body": news_item.body,
+                "excerpt": news_item.excerpt,
                 "date": news_item.date,
                 "user_id": news_item.user_id,
-                "author": None
+                "author": author_info(news_item),
+                "image_variants": news_item.image_variants
             }
-            
-            if news_item.user:
-                news_dict["author"] = {
-                    "id": news_item.user.id,
-                    "first_name": news_item.user.first_name,
-                    "last_name": news_item.user.last_name,
-                    "email": news_item.user.email
-                }
-            
-            response.append(NewsResponse(**news_dict))
-        
-        return response
+        else:
+            news_dict = news_response_dict(news_item)
+        result.append(news_dict)
+
+    # Last-Modified: la última edición visible o el último cambio conocido
+    # (un borrado no deja updated_at, pero sí incrementa la versión)
+    last_modified = max(
+        ([changed_at] if changed_at else [])
+        + [news_item.updated_at for news_item in news_list if news_item.updated_at],
+        default=None
+    )
+    body = orjson.dumps(result)
+    return FeedSnapshot(body, next_token, make_etag(body), last_modified)
+
+@router.get("/news/public/", response_model=Union[List[NewsResponse], List[NewsSummary]])
+def read_public_news(
+    request: Request,
+    cursor: Optional[str] = Query(None, description="Token devuelto en X-Next-Cursor"),
+    limit: Optional[int] = Query(None, ge=1),
+    fields: Optional[str] = Query(None, pattern="^summary$", description="summary: título, imagen y extracto"),
+    db: Session = Depends(get_read_db)
+):
+    try:
+        # La versión se lee antes de consultar: si una escritura llega en medio,
+        # el resultado queda guardado bajo una versión que ya no se usará.
+        changed_at = get_news_version_changed_at()
+        cache_key = (get_news_version(), cursor, limit, fields)
+        snapshot = public_feed_cache.get(cache_key)
+        if snapshot is None:
+            snapshot = build_public_feed(db, cursor, limit, fields, changed_at)
+            # Justo después de una escritura la réplica puede ir por detrás:
+            # ese snapshot solo se guarda mientras dura el margen de retraso
+            ttl = None
+            if uses_replica(db) and changed_recently(REPLICA_STICKY_SECONDS):
+                ttl = REPLICA_STICKY_SECONDS
+            public_feed_cache.set(cache_key, snapshot, ttl=ttl)
+
+        headers = validator_headers(snapshot.etag, snapshot.last_modified, "public, no-cache")
+        headers["Vary"] = "Accept-Encoding"
+        if snapshot.next_cursor:
+            headers[CURSOR_HEADER] = snapshot.next_cursor
+
+        # La representación se elige antes de evaluar la condición: el 304
+        # debe llevar el mismo validador (débil si va comprimida) que el 200
+        encoding = choose_encoding(request.headers.get("accept-encoding"))
+        if len(snapshot.body) < COMPRESSION_MIN_SIZE:
+            encoding = None
+        if encoding:
+            headers["ETag"] = weak_etag(snapshot.etag)
+
+        # Con el snapshot en caché, un sondeo sin cambios no toca la base de datos
+        if is_not_modified(request, snapshot.etag, snapshot.last_modified):
+            return not_modified(headers)
+
+        # La versión comprimida también se guarda en el snapshot: se comprime
+        # una vez (aquí, en el threadpool) y el middleware la deja pasar
+        if encoding:
+            headers["Content-Encoding"] = encoding
+            return Response(content=encode_snapshot(snapshot, encoding), media_type="application/json", headers=headers)
+
+        # Se devuelven los bytes ya serializados: sin validar ni codificar de nuevo
+        return Response(content=snapshot.body, media_type="application/json", headers=headers)
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error obteniendo noticias públicas: {str(e)}")
         raise HTTPException(
@@ -99,6 +209,174 @@ def read_public_news(db: Session = Depends(get_db)):
             detail="Error al recuperar las noticias públicas"
         )
 
+@router.get("/news/search", response_model=List[NewsSearchResult])
+def search_public_news(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200, description="Palabras a buscar"),
+    limit: int = Query(20, ge=1, le=MAX_LIMIT),
+    cursor: Optional[str] = Query(None, description="Token devuelto en X-Next-Cursor"),
+    db: Session = Depends(get_read_db)
+):
+    """
+    Búsqueda pública en título, subtítulo y cuerpo, ordenada por relevancia.
+    Cada resultado trae un fragmento del cuerpo con los términos resaltados.
+    """
+    try:
+        hits, next_token = search_news(db, q, limit, cursor)
+        if not hits:
+            return []
+        news_ids = [news_id for news_id, _, _ in hits]
+        rows = apply_fields(db.query(NewsModel), "summary")\
+            .filter(NewsModel.id.in_(news_ids))\
+            .all()
+        by_id = {news_item.id: news_item for news_item in rows}
+
+        results = []
+        for news_id, score, snippet in hits:
+            news_item = by_id.get(news_id)
+            if news_item is None:
+                continue
+            results.append(NewsSearchResult(
+                **NewsSummary.model_validate(news_item).model_dump(exclude={"author"}),
+                author=author_info(news_item),
+                snippet=snippet,
+                score=score
+            ))
+        if next_token:
+            response.headers[CURSOR_HEADER] = next_token
+        return results
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error buscando noticias: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail="Error al buscar noticias"
+        )
+
+# Exportar / importar: los lotes grandes se reciben en un fichero temporal
+# (en memoria hasta IMPORT_SPOOL_BYTES) y no en la memoria del proceso
+IMPORT_MAX_BYTES = int(os.getenv("IMPORT_MAX_BYTES", str(1024 * 1024 * 1024)))
+IMPORT_SPOOL_BYTES = 8 * 1024 * 1024
+
+@router.get("/news/export")
+def export_news(current_user: User = Depends(require_admin)):
+    """Todas las noticias en NDJSON, en streaming y con memoria constante"""
+    filename = f"news-{datetime.now():%Y%m%d-%H%M%S}.ndjson"
+    return StreamingResponse(
+        export_ndjson(),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+@router.post("/news/import")
+async def import_news(
+    request: Request,
+    on_conflict: str = Query("skip", pattern="^(skip|update)$", description="Qué hacer si (title, date) ya existe"),
+    current_user: User = Depends(require_admin)
+):
+    """
+    Importa noticias en NDJSON (el formato de /news/export). La respuesta
+    es NDJSON con el progreso de cada lote y un resumen final.
+    """
+    # El cuerpo se lee entero antes de responder: mientras se envía una
+    # StreamingResponse no se puede seguir leyendo la petición
+    spool = tempfile.SpooledTemporaryFile(max_size=IMPORT_SPOOL_BYTES)
+    received = 0
+    try:
+        async for chunk in request.stream():
+            received += len(chunk)
+            if received > IMPORT_MAX_BYTES:
+                raise HTTPException(
+                    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                    detail=f"El fichero supera {IMPORT_MAX_BYTES // (1024 * 1024)}MB"
+                )
+            await run_in_threadpool(spool.write, chunk)
+    except BaseException:
+        spool.close()
+        raise
+    spool.seek(0)
+    return StreamingResponse(import_ndjson(spool, on_conflict), media_type="application/x-ndjson")
+
+def save_news(db: Session, db_news: News, after_flush=None) -> News:
+    """
+    Guarda la noticia, actualiza el índice de búsqueda y la recarga.
+    Es síncrona: los endpoints async la llaman con run_in_threadpool para
+    no bloquear el event loop. after_flush(db, db_news) permite encolar
+    trabajos en la misma transacción, ya con el id asignado.
+    """
+    db.add(db_news)
+    db.flush()
+    index_news(db, db_news)
+    if after_flush is not None:
+        after_flush(db, db_news)
+    publish(db, NEWS, db_news.id)
+    db.commit()
+    job_worker.wake()
+    db.refresh(db_news)
+    return db_news
+
+def image_paths(storage, db_news: News) -> List[str]:
+    """Rutas en el bucket de la imagen de una noticia y de sus variantes"""
+    urls = [db_news.image_url] + [variant["url"] for variant in db_news.image_variants or []]
+    return [path for path in map(storage.path_from_url, urls) if path]
+
+def store_image_variants(news_id: int, image_url: str, variants: list) -> bool:
+    """
+    Guarda las variantes solo si la noticia sigue usando la misma imagen
+    (pudo cambiarse o borrarse mientras se generaban).
+    """
+    db = SessionLocal()
+    try:
+        updated = db.query(News)\
+            .filter(News.id == news_id, News.image_url == image_url)\
+            .update({News.image_variants: variants, News.updated_at: datetime.now()}, synchronize_session=False)
+        if updated:
+            publish(db, NEWS, news_id)
+        db.commit()
+    finally:
+        db.close()
+    return bool(updated)
+
+def news_uses_image(news_id: int, image_url: str) -> bool:
+    db = SessionLocal()
+    try:
+        return db.query(News.id).filter(News.id == news_id, News.image_url == image_url).first() is not None
+    finally:
+        db.close()
+
+def enqueue_image_variants(db: Session, db_news: News, file_path: str) -> None:
+    enqueue(db, IMAGE_VARIANTS_JOB, {"news_id": db_news.id, "file_path": file_path})
+
+@job_handler(IMAGE_VARIANTS_JOB)
+async def generate_image_variants(payload: dict) -> None:
+    """
+    Trabajo en segundo plano: descarga la imagen original, genera las
+    variantes en el pool de procesos y las sube junto a ella.
+    Si falla, la cola lo reintenta con backoff.
+    """
+    news_id, file_path = payload["news_id"], payload["file_path"]
+    storage = get_storage()
+    image_url = storage.public_url(file_path)
+    if not await run_in_threadpool(news_uses_image, news_id, image_url):
+        # La noticia se borró o cambió de imagen antes de llegar aquí
+        return
+
+    original = await storage.download(file_path)
+    rendered = await render_variants_async(original)
+    paths = [variant_path(file_path, width, extension) for width, extension, _, _ in rendered]
+    urls = await asyncio.gather(*(
+        storage.upload(path, data, content_type)
+        for path, (_, _, content_type, data) in zip(paths, rendered)
+    ))
+    variants = [
+        {"width": width, "format": extension, "url": url}
+        for (width, extension, _, _), url in zip(rendered, urls)
+    ]
+    stored = await run_in_threadpool(store_image_variants, news_id, image_url, variants)
+    if not stored:
+        await run_in_threadpool(enqueue_now, STORAGE_DELETE, {"paths": paths})
+
 @router.post("/news/", response_model=NewsResponse)
 async def create_news(
     title: str = Form(...),
@@ -111,72 +389,55 @@ async def create_news(
 ):
     """
     Endpoint para crear noticias con imágenes.
-    - Sube imágenes a Supabase Storage
+    - Sube imágenes al almacenamiento configurado (Supabase o disco local)
     - Almacena metadatos en PostgreSQL
     - Usa autenticación JWT
+    - Las variantes redimensionadas se generan después de responder
     """
-    # Configuración Supabase
-    supabase_url = os.getenv("SUPABASE_URL")
-    supabase_key = os.getenv("SUPABASE_SERVICE_ROLE")
-    bucket_name = os.getenv("SUPABASE_BUCKET", "newsimages")
-
-    if not all([supabase_url, supabase_key]):
+    storage = get_storage()
+    if not storage.configured:
         raise HTTPException(
             status_code=500,
-            detail="Configuración de Supabase incompleta"
+            detail="Configuración de almacenamiento incompleta"
         )
 
+    invalid_type = HTTPException(
+        status_code=400,
+        detail="Tipo de imagen no soportado. Formatos permitidos: JPEG, PNG, WEBP, GIF"
+    )
+    too_large = HTTPException(
+        status_code=400,
+        detail=f"Imagen demasiado grande. Tamaño máximo: {MAX_IMAGE_SIZE//(1024*1024)}MB"
+    )
+
     try:
-        # 1. Validar imagen
-        allowed_types = ["image/jpeg", "image/png", "image/webp", "image/gif"]
-        max_size = 5 * 1024 * 1024  # 5MB
-        
-        file_content = await image.read()
-        if image.content_type not in allowed_types:
-            raise HTTPException(
-                status_code=400,
-                detail="Tipo de imagen no soportado. Formatos permitidos: JPEG, PNG, WEBP, GIF"
-            )
-        if len(file_content) > max_size:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Imagen demasiado grande. Tamaño máximo: {max_size//(1024*1024)}MB"
-            )
+        # 1. Validar imagen: tipo, magic bytes del primer trozo y tamaño conocido
+        try:
+            image_stream = await open_image_stream(image)
+        except InvalidImageType:
+            raise invalid_type
+        except ImageTooLarge:
+            raise too_large
 
         # 2. Generar nombre único para el archivo
-        file_ext = os.path.splitext(image.filename)[1].lower() or f".{image.content_type.split('/')[1]}"
+        file_ext = image_extension(image, image_stream.content_type)
         file_name = f"{uuid.uuid4()}{file_ext}"
         file_path = f"news/{file_name}"
 
-        # 3. Subir imagen a Supabase Storage
+        # 3. Subir imagen al almacenamiento por trozos (cliente compartido)
         try:
-            upload_url = f"{supabase_url}/storage/v1/object/{bucket_name}/{file_path}"
-            headers = {
-                "Authorization": f"Bearer {supabase_key}",
-                "Content-Type": image.content_type,
-                "x-upsert": "true"
-            }
-            
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.post(
-                    upload_url,
-                    content=file_content,
-                    headers=headers
-                )
-                
-                if response.status_code != 200:
-                    error_detail = response.text
-                    raise HTTPException(
-                        status_code=response.status_code,
-                        detail=f"Error al subir imagen: {error_detail}"
-                    )
-
-        except httpx.RequestError as req_error:
-            logger.error(f"Error de conexión con Supabase: {str(req_error)}")
+            image_url = await storage.upload(
+                file_path, image_stream, image_stream.content_type, image_stream.size
+            )
+        except ImageTooLarge:
+            raise too_large
+        except StorageError as storage_error:
             raise HTTPException(
-                status_code=503,
-                detail="Error al conectar con el servicio de almacenamiento"
+                status_code=storage_error.status_code,
+                detail=storage_error.detail
             )
+        except HTTPException:
+            raise
         except Exception as upload_error:
             logger.error(f"Error al subir imagen: {str(upload_error)}")
             raise HTTPException(
@@ -185,8 +446,6 @@ async def create_news(
             )
 
         # 4. Crear registro en base de datos
-        image_url = f"{supabase_url}/storage/v1/object/public/{bucket_name}/{file_path}"
-        
         try:
             db_news = News(
                 title=title.strip(),
@@ -194,30 +453,26 @@ async def create_news(
                 image_url=image_url,
                 image_description=image_description.strip(),
                 body=body.strip(),
+                excerpt=make_excerpt(body),
                 date=datetime.now(),
-                user_id=current_user.id  # UUID del usuario
+                user_id=current_user.id,  # UUID del usuario
+                **author_columns(current_user)
             )
             
-            db.add(db_news)
-            db.commit()
-            db.refresh(db_news)
-            
-            return db_news
+            # Las variantes se encolan en la misma transacción que la noticia
+            return await run_in_threadpool(
+                save_news, db, db_news,
+                lambda db, news: enqueue_image_variants(db, news, file_path)
+            )
             
         except Exception as db_error:
-            db.rollback()
-            # Eliminar imagen subida si falla la creación en DB
+            await run_in_threadpool(db.rollback)
+            # La imagen subida queda huérfana: encolar su borrado
             try:
-                async with httpx.AsyncClient() as client:
-                    await client.delete(
-                        f"{supabase_url}/storage/v1/object/{bucket_name}/{file_path}",
-                        headers={
-                            "Authorization": f"Bearer {supabase_key}",
-                            "apikey": supabase_key
-                        }
-                    )
+                await run_in_threadpool(enqueue_now, STORAGE_DELETE, {"paths": [file_path]})
+                job_worker.wake()
             except Exception:
-                logger.error("No se pudo eliminar la imagen fallida")
+                logger.error("No se pudo encolar el borrado de la imagen fallida")
             
             logger.error(f"Error en base de datos: {str(db_error)}", exc_info=True)
             raise HTTPException(
@@ -252,13 +507,10 @@ async def update_news(
     - Todos los campos son opcionales
     - Permite actualizar la imagen
     """
-    # Configuración Supabase
-    supabase_url = os.getenv("SUPABASE_URL")
-    supabase_key = os.getenv("SUPABASE_SERVICE_ROLE")
-    bucket_name = os.getenv("SUPABASE_BUCKET", "newsimages")
+    storage = get_storage()
 
     # Obtener la noticia existente
-    db_news = db.query(News).filter(News.id == news_id).first()
+    db_news = await run_in_threadpool(db.get, News, news_id)
     if not db_news:
         raise HTTPException(status_code=404, detail="Noticia no encontrada")
 
@@ -272,69 +524,46 @@ async def update_news(
 
     try:
         image_url = db_news.image_url
+        old_paths = []
         
         # Procesar nueva imagen si se proporciona
         if image:
-            # Validar imagen
-            allowed_types = ["image/jpeg", "image/png", "image/webp", "image/gif"]
-            max_size = 5 * 1024 * 1024  # 5MB
-            
-            file_content = await image.read()
-            if image.content_type not in allowed_types:
+            too_large = HTTPException(
+                status_code=400,
+                detail="Imagen demasiado grande (máximo 5MB)"
+            )
+
+            # Validar imagen sin leerla entera
+            try:
+                image_stream = await open_image_stream(image)
+            except InvalidImageType:
                 raise HTTPException(
                     status_code=400,
                     detail="Tipo de imagen no soportado"
                 )
-            if len(file_content) > max_size:
-                raise HTTPException(
-                    status_code=400,
-                    detail="Imagen demasiado grande (máximo 5MB)"
-                )
+            except ImageTooLarge:
+                raise too_large
 
             # Generar nuevo nombre de archivo
-            file_ext = os.path.splitext(image.filename)[1].lower() or f".{image.content_type.split('/')[1]}"
+            file_ext = image_extension(image, image_stream.content_type)
             file_name = f"{uuid.uuid4()}{file_ext}"
             file_path = f"news/{file_name}"
 
-            # Subir nueva imagen
+            # Subir nueva imagen por trozos
             try:
-                upload_url = f"{supabase_url}/storage/v1/object/{bucket_name}/{file_path}"
-                headers = {
-                    "Authorization": f"Bearer {supabase_key}",
-                    "Content-Type": image.content_type,
-                    "x-upsert": "true"
-                }
-                
-                async with httpx.AsyncClient(timeout=30.0) as client:
-                    response = await client.post(
-                        upload_url,
-                        content=file_content,
-                        headers=headers
+                try:
+                    image_url = await storage.upload(
+                        file_path, image_stream, image_stream.content_type, image_stream.size
                     )
-                    
-                    if response.status_code != 200:
-                        raise HTTPException(
-                            status_code=response.status_code,
-                            detail="Error al subir nueva imagen"
-                        )
-
-                image_url = f"{supabase_url}/storage/v1/object/public/{bucket_name}/{file_path}"
+                except ImageTooLarge:
+                    raise too_large
                 
-                # Eliminar imagen anterior si existe y es diferente
-                if db_news.image_url and db_news.image_url != image_url:
-                    try:
-                        old_file_path = db_news.image_url.split("/object/public/")[1]
-                        async with httpx.AsyncClient() as client:
-                            await client.delete(
-                                f"{supabase_url}/storage/v1/object/{bucket_name}/{old_file_path}",
-                                headers={
-                                    "Authorization": f"Bearer {supabase_key}",
-                                    "apikey": supabase_key
-                                }
-                            )
-                    except Exception:
-                        logger.error("No se pudo eliminar la imagen anterior")
+                # La imagen anterior (y sus variantes) se borra después del commit
+                if db_news.image_url != image_url:
+                    old_paths = image_paths(storage, db_news)
 
+            except HTTPException:
+                raise
             except Exception as upload_error:
                 logger.error(f"Error al subir imagen: {str(upload_error)}")
                 raise HTTPException(
@@ -351,43 +580,138 @@ async def update_news(
             "body": body.strip() if body else db_news.body
         }
 
+        update_data["excerpt"] = make_excerpt(update_data["body"])
+        if image_url != db_news.image_url:
+            # Las variantes de la imagen anterior ya no sirven
+            update_data["image_variants"] = None
+
         for key, value in update_data.items():
             setattr(db_news, key, value)
+        db_news.updated_at = datetime.now()
 
-        db.commit()
-        db.refresh(db_news)
-        
-        return db_news
+        def enqueue_side_effects(db: Session, news: News) -> None:
+            enqueue_storage_delete(db, old_paths)
+            if image:
+                enqueue_image_variants(db, news, file_path)
+
+        return await run_in_threadpool(save_news, db, db_news, enqueue_side_effects)
 
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
+        await run_in_threadpool(db.rollback)
         logger.error(f"Error al actualizar noticia: {str(e)}", exc_info=True)
         raise HTTPException(
             status_code=500,
             detail="Error interno al actualizar la noticia"
         )
 
+def news_etag(news_id: int, updated_at: Optional[datetime]) -> Optional[str]:
+    if updated_at is None:
+        return None
+    return f'"n{news_id}-{int(updated_at.timestamp() * 1_000_000)}"'
+
+def can_read_news(current_user, user_id) -> bool:
+    # Admin puede ver todo, usuario solo sus noticias o noticias sin dueño
+    return current_user.role == "admin" or user_id in [None, current_user.id]
+
+def cached_news_items(db: Session, news_ids: List[int]) -> dict:
+    """
+    Noticias serializadas por id, desde news_item_cache; las que faltan se
+    leen en una sola consulta IN. Los ids inexistentes no aparecen.
+    """
+    # Las claves se calculan antes de consultar: si una escritura llega en
+    # medio, lo leído queda bajo una versión que ya no se usará
+    keys = {news_id: news_item_key(news_id) for news_id in news_ids}
+    items = {}
+    for news_id, key in keys.items():
+        item = news_item_cache.get(key)
+        if item is not None:
+            items[news_id] = item
+    missing = [news_id for news_id in news_ids if news_id not in items]
+    if not missing:
+        return items
+
+    # Igual que el feed: recién escrita, la réplica puede ir por detrás
+    ttl = None
+    if uses_replica(db) and changed_recently(REPLICA_STICKY_SECONDS):
+        ttl = REPLICA_STICKY_SECONDS
+    for news_item in db.query(NewsModel).filter(NewsModel.id.in_(missing)):
+        item = NewsItemSnapshot(
+            orjson.dumps(news_response_dict(news_item)),
+            news_item.user_id,
+            news_etag(news_item.id, news_item.updated_at),
+            news_item.updated_at
+        )
+        news_item_cache.set(keys[news_item.id], item, ttl=ttl)
+        items[news_item.id] = item
+    return items
+
+@router.get("/news/batch", response_model=List[NewsResponse])
+def read_news_batch(
+    request: Request,
+    ids: str = Query(..., description="Ids separados por comas, p. ej. 1,2,3"),
+    current_user: UserModel = Depends(get_current_active_user),
+    db: Session = Depends(get_read_db)
+):
+    """
+    Varias noticias en una petición, en el orden pedido. Se aplican los
+    mismos permisos que en /news/{news_id}: las noticias inexistentes o
+    sin permiso se omiten.
+    """
+    try:
+        news_ids = list(dict.fromkeys(int(value) for value in ids.split(",") if value.strip()))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ids debe ser una lista de números separados por comas")
+    if not news_ids or len(news_ids) > MAX_LIMIT:
+        raise HTTPException(status_code=400, detail=f"Se admiten entre 1 y {MAX_LIMIT} ids")
+
+    try:
+        items = cached_news_items(db, news_ids)
+        visible = [
+            items[news_id] for news_id in news_ids
+            if news_id in items and can_read_news(current_user, items[news_id].user_id)
+        ]
+        body = b"[" + b",".join(item.body for item in visible) + b"]"
+        etag = make_etag(body)
+        headers = validator_headers(etag, None, "private, no-cache")
+        if is_not_modified(request, etag, None):
+            return not_modified(headers)
+        return Response(content=body, media_type="application/json", headers=headers)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error obteniendo noticias por lote: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail="Error al recuperar las noticias"
+        )
+
 @router.get("/news/{news_id}", response_model=NewsResponse)
 def read_single_news(
     news_id: int,
+    request: Request,
     current_user: UserModel = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     try:
-        news = db.query(NewsModel).filter(NewsModel.id == news_id).first()
-        if not news:
+        # Con la noticia en caché no se consulta la base de datos
+        item = cached_news_items(db, [news_id]).get(news_id)
+        if item is None:
             raise HTTPException(status_code=404, detail="Noticia no encontrada")
         
-        # Verificar permisos (admin puede ver todo, usuario solo sus noticias o noticias sin dueño)
-        if current_user.role != "admin" and news.user_id not in [None, current_user.id]:
+        if not can_read_news(current_user, item.user_id):
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="No tienes permiso para ver esta noticia"
             )
-            
-        return news
+
+        headers = validator_headers(item.etag, item.updated_at, "private, no-cache")
+        if is_not_modified(request, item.etag, item.updated_at):
+            return not_modified(headers)
+
+        # Bytes ya serializados, como en el feed público
+        return Response(content=item.body, media_type="application/json", headers=headers)
     except HTTPException as he:
         raise he
     except Exception as e:
@@ -397,22 +721,37 @@ def read_single_news(
             detail="Error al recuperar la noticia"
         )
 
-@router.get("/news/", response_model=List[NewsResponse])
+@router.get("/news/", response_model=Union[List[NewsResponse], List[NewsSummary]])
 def read_news(
+    response: Response,
     skip: int = 0,
     limit: int = 10,
+    cursor: Optional[str] = Query(None, description="Token devuelto en X-Next-Cursor"),
+    fields: Optional[str] = Query(None, pattern="^summary$", description="summary: título, imagen y extracto"),
     current_user: UserModel = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     try:
-        if current_user.role == "admin":
-            # Admin ve todas las noticias, incluyendo las sin usuario
-            return db.query(NewsModel).offset(skip).limit(limit).all()
-        else:
-            # Usuario normal solo ve sus propias noticias
-            return db.query(NewsModel).filter(
-                NewsModel.user_id == current_user.id
-            ).offset(skip).limit(limit).all()
+        query = apply_fields(db.query(NewsModel), fields)
+        if current_user.role != "admin":
+            # Usuario normal solo ve sus propias noticias (usa ix_news_user_id_date)
+            query = query.filter(NewsModel.user_id == current_user.id)
+        # Admin ve todas las noticias, incluyendo las sin usuario
+
+        page_size = clamp_limit(limit, 10, MAX_LIMIT)
+        query = apply_keyset(query, NewsModel, cursor)
+        if cursor is None and skip:
+            # Modo offset heredado; con cursor se ignora skip
+            query = query.offset(skip)
+
+        rows = query.limit(page_size + 1).all()
+        news_list, next_token = split_page(rows, page_size)
+        if next_token:
+            response.headers[CURSOR_HEADER] = next_token
+        schema = NewsSummary if fields == "summary" else NewsResponse
+        return [schema.model_validate(news_item) for news_item in news_list]
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error obteniendo noticias: {str(e)}")
         raise HTTPException(
@@ -420,15 +759,24 @@ def read_news(
             detail="Error al recuperar las noticias"
         )
 
+def delete_news_row(db: Session, db_news: News, file_paths: List[str]) -> None:
+    # El borrado de las imágenes se confirma junto con el de la noticia
+    enqueue_storage_delete(db, file_paths)
+    unindex_news(db, db_news.id)
+    publish(db, NEWS, db_news.id)
+    db.delete(db_news)
+    db.commit()
+    job_worker.wake()
+
 @router.delete("/news/{news_id}")
-def delete_news(
+async def delete_news(
     news_id: int,
     current_user: UserModel = Depends(get_current_active_user),
-    token: str = Depends(oauth2_scheme),
     db: Session = Depends(get_db)
 ):
+    storage = get_storage()
     try:
-        db_news = db.query(NewsModel).filter(NewsModel.id == news_id).first()
+        db_news = await run_in_threadpool(db.get, NewsModel, news_id)
         if not db_news:
             raise HTTPException(status_code=404, detail="Noticia no encontrada")
         
@@ -439,31 +787,17 @@ def delete_news(
                 detail="No tienes permiso para eliminar esta noticia"
             )
         
-        supabase = get_supabase_client(token)
-        bucket_name = os.getenv("SUPABASE_BUCKET", "newsimages")
-        
-        if db_news.image_url:
-            try:
-                storage_prefix = f"{os.getenv('SUPABASE_URL')}/storage/v1/object/public/{bucket_name}/"
-                if db_news.image_url.startswith(storage_prefix):
-                    file_path = db_news.image_url[len(storage_prefix):]
-                    supabase.storage.from_(bucket_name).remove([file_path])
-            except Exception as storage_error:
-                logger.error(f"Error eliminando imagen: {str(storage_error)}")
-                # No fallar si no se puede eliminar la imagen
-        
-        # Eliminar de la base de datos
-        db.delete(db_news)
-        db.commit()
+        # Eliminar de la base de datos; las imágenes las borra la cola de trabajos
+        await run_in_threadpool(delete_news_row, db, db_news, image_paths(storage, db_news))
         
         return {"message": "Noticia eliminada exitosamente"}
         
     except HTTPException as he:
         raise he
     except Exception as e:
-        db.rollback()
+        await run_in_threadpool(db.rollback)
         logger.error(f"Error eliminando noticia: {str(e)}")
         raise HTTPException(
             status_code=500,
             detail="Error al eliminar la noticia"
-        )
\ No newline at end of file
+        )
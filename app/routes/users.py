@@ -1,16 +1,21 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Security, Response
 from sqlalchemy.orm import Session
 import uuid
-from app.database import get_db
-from app.models.user import User as UserModel, UserRole
+from datetime import datetime
+from app.database import get_db, get_read_db
+from app.models.user import User as UserModel
 from app.schemas.user import User, UserCreate, UserUpdate
 from app.core.security import get_current_active_user, get_password_hash
+from app.core.invalidation import USER, publish
 
 router = APIRouter()
 
+# Los endpoints son síncronos (def) porque usan la Session síncrona de SQLAlchemy:
+# FastAPI los ejecuta en el threadpool y no bloquean el event loop.
+
 # Crear usuario (solo admin)
 @router.post("/", response_model=User, status_code=status.HTTP_201_CREATED)
-async def create_user(
+def create_user(
     user_data: UserCreate,
     db: Session = Depends(get_db),
     current_user: UserModel = Security(get_current_active_user, scopes=["admin"])
@@ -34,10 +39,10 @@ async def create_user(
 
 # Obtener todos los usuarios (solo admin)
 @router.get("/", response_model=list[User])
-async def read_users(
+def read_users(
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: UserModel = Security(get_current_active_user, scopes=["admin"])
 ):
     users = db.query(UserModel).offset(skip).limit(limit).all()
@@ -45,8 +50,8 @@ async def read_users(
 
 # Obtener usuario específico
 @router.get("/{user_id}", response_model=User)
-async def read_user(
-    user_id: int,
+def read_user(
+    user_id: uuid.UUID,
     db: Session = Depends(get_db),
     current_user: UserModel = Security(get_current_active_user, scopes=["admin", "user"])
 ):
@@ -64,8 +69,8 @@ async def read_user(
 
 # Actualizar usuario
 @router.put("/{user_id}", response_model=User)
-async def update_user(
-    user_id: int,
+def update_user(
+    user_id: uuid.UUID,
     user_data: UserUpdate,
     db: Session = Depends(get_db),
     current_user: UserModel = Security(get_current_active_user, scopes=["admin", "user"])
@@ -86,6 +91,14 @@ async def update_user(
             detail="Only admin can change user roles"
         )
     
+    author_changed = any(
+        value is not None and value != getattr(db_user, field)
+        for field, value in (
+            ("email", user_data.email),
+            ("first_name", user_data.first_name),
+            ("last_name", user_data.last_name),
+        )
+    )
     if user_data.email is not None:
         db_user.email = user_data.email
     if user_data.first_name is not None:  # Nuevo campo
@@ -98,16 +111,25 @@ async def update_user(
         db_user.role = user_data.role
     if user_data.is_active is not None:
         db_user.is_active = user_data.is_active
+
+    # Nombre o email cambiados: actualizar la copia del autor en sus noticias
+    if author_changed:
+        db.query(News).filter(News.user_id == db_user.id).update(
+            author_columns(db_user), synchronize_session=False
+        )
     
+    # Rol, estado o email pueden haber cambiado: descartar la sesión en caché
+    # (en todos los workers) y el feed, que muestra nombre y email del autor
+    publish(db, USER, db_user.id)
     db.commit()
     db.refresh(db_user)
     return db_user
 
 # Eliminar usuario (solo admin)
-from app.models.news import News  # Asegúrate de importar tu modelo News
+from app.models.news import News, author_columns  # Asegúrate de importar tu modelo News
 
 @router.delete("/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_user(
+def delete_user(
     user_id: str,
     db: Session = Depends(get_db),
     current_user: UserModel = Security(get_current_active_user, scopes=["admin"])
@@ -128,10 +150,15 @@ async def delete_user(
         )
     
     # Actualizar las noticias para desasociarlas del usuario
-    db.query(News).filter(News.user_id == user_uuid).update({News.user_id: None})
+    db.query(News).filter(News.user_id == user_uuid).update(
+        {News.user_id: None, News.updated_at: datetime.now(), **author_columns(None)},
+        synchronize_session=False
+    )
     
     # Eliminar el usuario
     db.delete(db_user)
+    # Invalida su sesión en caché y el feed público, que incluye al autor
+    publish(db, USER, user_uuid)
     db.commit()
     
     return Response(status_code=status.HTTP_204_NO_CONTENT)
\ No newline at end of file
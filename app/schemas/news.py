@@ -1,6 +1,6 @@
 from pydantic import BaseModel, Field
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 from uuid import UUID
 from fastapi import Form
 
@@ -10,6 +10,11 @@ class AuthorInfo(BaseModel):
     last_name: str
     email: str
 
+class ImageVariant(BaseModel):
+    width: int
+    format: str
+    url: str
+
 class NewsBase(BaseModel):
     title: str
     subtitle: str
@@ -38,5 +43,26 @@ class NewsResponse(NewsBase):
     date: datetime
     user_id: Optional[UUID] = Field(None)
     author: Optional[AuthorInfo] = None
+    image_variants: Optional[List[ImageVariant]] = None
+    class Config:
+        from_attributes = True
+
+class NewsSummary(BaseModel):
+    """Proyección compacta para listados: sin el cuerpo completo"""
+    id: int
+    title: str
+    subtitle: str
+    image_url: Optional[str] = None
+    image_description: str
+    excerpt: Optional[str] = None
+    date: datetime
+    user_id: Optional[UUID] = Field(None)
+    author: Optional[AuthorInfo] = None
+    image_variants: Optional[List[ImageVariant]] = None
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class NewsSearchResult(NewsSummary):
+    """Resumen con el fragmento que coincide (términos entre <mark>)"""
+    snippet: Optional[str] = None
+    score: float
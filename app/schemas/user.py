@@ -29,6 +29,8 @@ class User(UserBase):
 
 class UserUpdate(BaseModel):
     email: Optional[EmailStr] = None
+    first_name: Optional[str] = Field(None, min_length=1, max_length=50)
+    last_name: Optional[str] = Field(None, min_length=1, max_length=50)
     password: Optional[str] = None
     role: Optional[UserRole] = None
     is_active: Optional[bool] = None
@@ -0,0 +1,80 @@
+"""
+Benchmark del feed público: compara el camino anterior (dict -> NewsResponse
+-> validación de response_model -> JSON) con el snapshot pre-serializado.
+
+Uso:
+    python -m benchmarks.bench_public_feed --rows 1000 10000 --seconds 5
+"""
+import argparse
+import time
+
+from benchmarks.common import seed
+
+from typing import List
+from fastapi import Depends
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session, joinedload
+from app.database import get_db
+from app.main import app
+from app.core.cache import bump_news_version
+from app.models.news import News
+from app.schemas.news import NewsResponse
+
+@app.get("/bench/legacy-public/", response_model=List[NewsResponse])
+def legacy_public_news(db: Session = Depends(get_db)):
+    """Copia del read_public_news original, para comparar"""
+    news_list = db.query(News).options(joinedload(News.user)).order_by(News.date.desc()).all()
+    response = []
+    for news_item in news_list:
+        news_dict = {
+            "id": news_item.id,
+            "title": news_item.title,
+            "subtitle": news_item.subtitle,
+            "image_url": news_item.image_url,
+            "image_description": news_item.image_description,
+            "body": news_item.body,
+            "date": news_item.date,
+            "user_id": news_item.user_id,
+            "author": None
+        }
+        if news_item.user:
+            news_dict["author"] = {
+                "id": news_item.user.id,
+                "first_name": news_item.user.first_name,
+                "last_name": news_item.user.last_name,
+                "email": news_item.user.email
+            }
+        response.append(NewsResponse(**news_dict))
+    return response
+
+def run(client: TestClient, path: str, seconds: float, before=None) -> float:
+    count = 0
+    deadline = time.perf_counter() + seconds
+    started = time.perf_counter()
+    while time.perf_counter() < deadline:
+        if before:
+            before()
+        response = client.get(path)
+        assert response.status_code == 200, response.text
+        count += 1
+    return count / (time.perf_counter() - started)
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--seconds", type=float, default=5.0)
+    args = parser.parse_args()
+
+    client = TestClient(app)
+    print(f"{'rows':>7} {'legacy req/s':>13} {'snapshot miss':>14} {'snapshot hit':>13}")
+    for rows in args.rows:
+        seed(rows)
+        # Las dos rutas deben devolver el mismo JSON
+        assert client.get("/bench/legacy-public/").json() == client.get("/api/news/public/").json()
+        legacy = run(client, "/bench/legacy-public/", args.seconds)
+        miss = run(client, "/api/news/public/", args.seconds, before=bump_news_version)
+        hit = run(client, "/api/news/public/", args.seconds)
+        print(f"{rows:>7} {legacy:>13.1f} {miss:>14.1f} {hit:>13.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Mide el arranque en frío de un worker en procesos nuevos: tiempo de
+importar app.main, de ejecutar el lifespan y de servir la primera
+petición. Con --importtime muestra además los módulos más lentos
+(python -X importtime).
+
+Uso:
+    python -m benchmarks.bench_startup --runs 5
+    python -m benchmarks.bench_startup --importtime 15
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+from benchmarks.common import latency_summary
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+
+# Se ejecuta en un proceso nuevo para que ningún módulo esté ya importado
+PROBE = """
+import json, time
+started = time.perf_counter()
+import app.main
+imported = time.perf_counter()
+from fastapi.testclient import TestClient
+with TestClient(app.main.app) as client:
+    ready = time.perf_counter()
+    client.get("/docs")
+    served = time.perf_counter()
+print(json.dumps({
+    "import_s": imported - started,
+    "lifespan_s": ready - imported,
+    "first_request_s": served - ready,
+    "total_s": served - started,
+}))
+"""
+
+def probe(env: dict) -> dict:
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE], cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def slowest_imports(env: dict, top: int) -> list[dict]:
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    ).stderr
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = [part.strip() for part in line[len("import time:"):].split("|")]
+        modules.append({"module": name, "self_ms": int(self_us) / 1000, "cumulative_ms": int(cumulative_us) / 1000})
+    return sorted(modules, key=lambda module: module["self_ms"], reverse=True)[:top]
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--importtime", type=int, default=0, metavar="N", help="mostrar los N módulos más lentos")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    runs = [probe(env) for _ in range(args.runs)]
+    report = {
+        phase.removesuffix("_s"): latency_summary([run[phase] for run in runs])
+        for phase in ("import_s", "lifespan_s", "first_request_s", "total_s")
+    }
+    if args.importtime:
+        report["slowest_imports"] = slowest_imports(env, args.importtime)
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
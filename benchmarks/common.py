@@ -0,0 +1,79 @@
+"""
+Utilidades compartidas por los benchmarks: entorno aislado en SQLite,
+datos de prueba y estadísticas de latencia.
+"""
+import os
+import sys
+import tempfile
+
+_tmpdir = tempfile.mkdtemp(prefix="rmm-bench-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_tmpdir}/bench.db")
+os.environ.setdefault("SUPABASE_URL", "http://127.0.0.1:54321")
+os.environ.setdefault("SUPABASE_KEY", "bench")
+os.environ.setdefault("SUPABASE_SERVICE_ROLE", "bench")
+os.environ.setdefault("SECRET_KEY", "bench")
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import uuid
+from datetime import datetime, timedelta
+from app.database import Base, SessionLocal, engine
+from app.core.cache import bump_news_version
+from app.core.search import ensure_search_schema, rebuild_search_index
+from app.core.security import get_password_hash
+from app.models.job import Job  # noqa: F401  (tabla jobs)
+from app.models.cache_event import CacheEvent  # noqa: F401  (tabla cache_events)
+from app.models.news import News, author_columns, make_excerpt
+from app.models.user import User
+
+BENCH_PASSWORD = "bench-password"
+BODY = "Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 30
+
+def seed(news: int, users: int = 1) -> list[User]:
+    """Recrea el esquema y carga `news` noticias repartidas entre `users` usuarios"""
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    ensure_search_schema(engine)
+    db = SessionLocal()
+    try:
+        # Un único hash para todos: bcrypt es lento a propósito
+        hashed = get_password_hash(BENCH_PASSWORD)
+        authors = [
+            User(id=uuid.uuid4(), email=f"bench{i}@example.com", first_name="Bench", last_name=f"User {i}",
+                 hashed_password=hashed, role="admin" if i == 0 else "user", is_active=True)
+            for i in range(users)
+        ]
+        db.bulk_save_objects(authors)
+        start = datetime(2024, 1, 1)
+        excerpt = make_excerpt(BODY)
+        for offset in range(0, news, 5000):
+            db.bulk_save_objects([
+                News(title=f"Noticia {i}", subtitle="Subtítulo", image_url=f"https://example.com/{i}.jpg",
+                     image_description="Imagen", body=BODY, excerpt=excerpt,
+                     date=start + timedelta(minutes=i), updated_at=start + timedelta(minutes=i),
+                     user_id=authors[i % users].id, **author_columns(authors[i % users]))
+                for i in range(offset, min(offset + 5000, news))
+            ])
+        rebuild_search_index(db, only_missing=False)
+        db.commit()
+        return authors
+    finally:
+        db.close()
+        bump_news_version()
+
+def percentile(samples: list[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+def latency_summary(samples: list[float]) -> dict:
+    """Resumen en milisegundos de una lista de duraciones en segundos"""
+    return {
+        "count": len(samples),
+        "p50_ms": round(percentile(samples, 50) * 1000, 2),
+        "p95_ms": round(percentile(samples, 95) * 1000, 2),
+        "p99_ms": round(percentile(samples, 99) * 1000, 2),
+        "max_ms": round(max(samples) * 1000, 2) if samples else 0.0,
+    }
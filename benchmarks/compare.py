@@ -0,0 +1,44 @@
+"""
+Compara dos salidas JSON de benchmarks.suite escenario por escenario.
+
+Uso:
+    python -m benchmarks.compare base.json cambio.json
+"""
+import argparse
+import json
+
+METRICS = ("throughput_rps", "p50_ms", "p95_ms", "p99_ms", "queries_per_request", "peak_rss_mb")
+# Para estas métricas más alto es mejor; para el resto, más bajo
+HIGHER_IS_BETTER = {"throughput_rps"}
+
+def change(before: float, after: float) -> str:
+    if not before:
+        return "n/a"
+    return f"{(after - before) / before * 100:+.1f}%"
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("base")
+    parser.add_argument("candidate")
+    args = parser.parse_args()
+
+    with open(args.base) as f:
+        base = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+
+    for key in ("news", "users", "concurrency", "seconds"):
+        if base["meta"].get(key) != candidate["meta"].get(key):
+            print(f"Aviso: {key} distinto ({base['meta'].get(key)} vs {candidate['meta'].get(key)})")
+
+    print(f"{'escenario':<20} {'métrica':<20} {'base':>10} {'cambio':>10} {'delta':>9}")
+    for name in sorted(set(base["scenarios"]) & set(candidate["scenarios"])):
+        for metric in METRICS:
+            before = base["scenarios"][name].get(metric, 0)
+            after = candidate["scenarios"][name].get(metric, 0)
+            better = (after > before) if metric in HIGHER_IS_BETTER else (after < before)
+            marker = "" if before == after else (" +" if better else " -")
+            print(f"{name:<20} {metric:<20} {before:>10} {after:>10} {change(before, after):>9}{marker}")
+
+if __name__ == "__main__":
+    main()
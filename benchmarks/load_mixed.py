@@ -0,0 +1,79 @@
+"""
+Prueba de carga con tráfico mixto: lecturas del feed, listados autenticados,
+administración de usuarios y logins, todo concurrente contra la app en proceso.
+
+Lo que interesa es la latencia de cola (p95/p99) de las lecturas rápidas
+mientras hay consultas lentas en vuelo: si alguna consulta corriera en el
+event loop, todas las demás peticiones esperarían detrás de ella.
+--db-latency-ms simula la latencia de red de una base de datos remota.
+
+Uso:
+    python -m benchmarks.load_mixed --concurrency 32 --seconds 10 --db-latency-ms 20
+"""
+import argparse
+import asyncio
+import json
+import time
+from collections import defaultdict
+
+from benchmarks.common import BENCH_PASSWORD, latency_summary, seed
+
+import httpx
+from sqlalchemy import event
+from app.database import engine
+from app.main import app
+
+MIX = [
+    ("GET", "/api/news/public/?limit=20&fields=summary", False),
+    ("GET", "/api/news/?limit=10", True),
+    ("GET", "/users/?limit=50", True),
+    ("POST", "/auth/login", False),
+]
+
+def add_db_latency(milliseconds: float) -> None:
+    @event.listens_for(engine, "before_cursor_execute")
+    def _sleep(*args):
+        time.sleep(milliseconds / 1000)
+
+async def worker(client, token, deadline, samples, index):
+    auth = {"Authorization": f"Bearer {token}"}
+    while time.perf_counter() < deadline:
+        method, path, needs_auth = MIX[index % len(MIX)]
+        index += 1
+        started = time.perf_counter()
+        if method == "POST":
+            response = await client.post(path, data={"username": "bench0@example.com", "password": BENCH_PASSWORD})
+        else:
+            response = await client.get(path, headers=auth if needs_auth else None)
+        samples[path].append(time.perf_counter() - started)
+        if response.status_code >= 500:
+            raise RuntimeError(f"{path}: {response.status_code} {response.text}")
+
+async def main_async(args) -> dict:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        login = await client.post("/auth/login", data={"username": "bench0@example.com", "password": BENCH_PASSWORD})
+        token = login.json()["access_token"]
+        samples = defaultdict(list)
+        deadline = time.perf_counter() + args.seconds
+        await asyncio.gather(*(
+            worker(client, token, deadline, samples, i) for i in range(args.concurrency)
+        ))
+    return {path: latency_summary(values) for path, values in samples.items()}
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--news", type=int, default=1000)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--db-latency-ms", type=float, default=0.0)
+    args = parser.parse_args()
+
+    seed(args.news, args.users)
+    if args.db_latency_ms:
+        add_db_latency(args.db_latency_ms)
+    print(json.dumps(asyncio.run(main_async(args)), indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+"""
+Suite de benchmarks de la API completa, en proceso y reproducible.
+
+Carga una base SQLite temporal con el volumen pedido, sustituye Supabase
+Storage por un almacén en memoria (httpx.MockTransport) y ejecuta cada
+escenario con N clientes concurrentes durante un tiempo fijo. Por
+escenario informa: peticiones/s, p50/p95/p99, consultas SQL por petición,
+errores y el pico de RSS del proceso. La salida es JSON para comparar
+ejecuciones con benchmarks.compare.
+
+La cola de trabajos no se arranca: se mide solo el camino de la petición.
+
+Uso:
+    python -m benchmarks.suite --news 10000 --users 1000 --seconds 10 --output base.json
+    python -m benchmarks.suite --news 100000 --scenarios public_feed search
+"""
+import argparse
+import asyncio
+import io
+import json
+import platform
+import random
+import resource
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+from benchmarks.common import BENCH_PASSWORD, latency_summary, seed
+
+import httpx
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app.main import app
+from app.core.cache import public_feed_cache
+from app.core.storage import get_storage
+
+class FakeStorage:
+    """Supabase Storage en memoria: subir, descargar, borrar y listar"""
+
+    def __init__(self):
+        self.objects: dict[str, bytes] = {}
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        path = request.url.path.split("/storage/v1/object/", 1)[1]
+        if request.method == "POST" and path.startswith("list/"):
+            return httpx.Response(200, json=[])
+        if request.method in ("POST", "PUT"):
+            self.objects[path] = request.content
+            return httpx.Response(200, json={"Key": path})
+        if request.method == "DELETE":
+            if request.content:
+                for prefix in json.loads(request.content).get("prefixes", []):
+                    self.objects.pop(f"{path}/{prefix}", None)
+            else:
+                self.objects.pop(path, None)
+            return httpx.Response(200, json=[])
+        content = self.objects.get(path.replace("public/", "", 1))
+        if content is None:
+            return httpx.Response(404, json={"error": "not found"})
+        return httpx.Response(200, content=content)
+
+def install_fake_storage() -> FakeStorage:
+    fake = FakeStorage()
+    storage = get_storage()
+    storage._client = httpx.AsyncClient(
+        base_url=f"{storage.base_url}/storage/v1",
+        transport=httpx.MockTransport(fake.handle)
+    )
+    return fake
+
+def sample_png() -> bytes:
+    from PIL import Image
+    buffer = io.BytesIO()
+    Image.new("RGB", (640, 480), (180, 40, 40)).save(buffer, "PNG")
+    return buffer.getvalue()
+
+class QueryCounter:
+    """Cuenta las consultas SQL de todos los engines desde que se crea"""
+
+    def __init__(self):
+        self.count = 0
+        event.listen(Engine, "after_cursor_execute", self._count)
+
+    def _count(self, *args):
+        self.count += 1
+
+def peak_rss_mb() -> float:
+    # ru_maxrss está en KB en Linux y en bytes en macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+class Context:
+    """Datos compartidos por los escenarios: ids, tokens, imagen de prueba"""
+
+    def __init__(self, client: httpx.AsyncClient, authors: list, news: int, token: str):
+        self.client = client
+        self.authors = authors
+        self.news = news
+        self.token = token
+        self.auth = {"Authorization": f"Bearer {token}"}
+        self.image = sample_png()
+        self.cursors: list[str] = []
+
+    def random_news_id(self) -> int:
+        return random.randint(1, self.news)
+
+# Cada escenario es una corrutina que hace una petición y devuelve la respuesta
+
+async def public_feed(ctx: Context) -> httpx.Response:
+    return await ctx.client.get("/api/news/public/?limit=20&fields=summary")
+
+async def public_feed_cold(ctx: Context) -> httpx.Response:
+    # Se ejecuta sin caché (ver UNCACHED_SCENARIOS): coste real de construir el feed
+    return await ctx.client.get("/api/news/public/?limit=20&fields=summary")
+
+async def public_feed_pages(ctx: Context) -> httpx.Response:
+    cursor = random.choice(ctx.cursors) if ctx.cursors else None
+    url = "/api/news/public/?limit=20&fields=summary" + (f"&cursor={cursor}" if cursor else "")
+    return await ctx.client.get(url)
+
+async def single_news(ctx: Context) -> httpx.Response:
+    return await ctx.client.get(f"/api/news/{ctx.random_news_id()}", headers=ctx.auth)
+
+async def news_batch(ctx: Context) -> httpx.Response:
+    ids = ",".join(str(ctx.random_news_id()) for _ in range(20))
+    return await ctx.client.get(f"/api/news/batch?ids={ids}", headers=ctx.auth)
+
+async def news_list(ctx: Context) -> httpx.Response:
+    return await ctx.client.get("/api/news/?limit=20", headers=ctx.auth)
+
+async def search(ctx: Context) -> httpx.Response:
+    term = random.choice(["noticia", "lorem", "dolor", "consectetur"])
+    return await ctx.client.get(f"/api/news/search?q={term}&limit=20")
+
+async def login(ctx: Context) -> httpx.Response:
+    email = f"bench{random.randrange(len(ctx.authors))}@example.com"
+    return await ctx.client.post("/auth/login", data={"username": email, "password": BENCH_PASSWORD})
+
+async def create_news(ctx: Context) -> httpx.Response:
+    return await ctx.client.post(
+        "/api/news/",
+        headers=ctx.auth,
+        data={"title": "Noticia de carga", "subtitle": "Subtítulo", "image_description": "Imagen",
+              "body": "Cuerpo de la noticia de carga. " * 40},
+        files={"image": ("bench.png", ctx.image, "image/png")}
+    )
+
+async def update_news(ctx: Context) -> httpx.Response:
+    return await ctx.client.put(
+        f"/api/news/{ctx.random_news_id()}",
+        headers=ctx.auth,
+        data={"title": f"Actualizada {random.random():.6f}"},
+        files={"image": ("bench.png", ctx.image, "image/png")}
+    )
+
+async def users_admin(ctx: Context) -> httpx.Response:
+    user = random.choice(ctx.authors)
+    operation = random.randrange(3)
+    if operation == 0:
+        return await ctx.client.get("/users/?limit=50", headers=ctx.auth)
+    if operation == 1:
+        return await ctx.client.get(f"/users/{user.id}", headers=ctx.auth)
+    return await ctx.client.put(f"/users/{user.id}", headers=ctx.auth, json={"first_name": "Bench"})
+
+SCENARIOS = {
+    "public_feed": public_feed,
+    "public_feed_cold": public_feed_cold,
+    "public_feed_pages": public_feed_pages,
+    "single_news": single_news,
+    "news_batch": news_batch,
+    "news_list": news_list,
+    "search": search,
+    "login": login,
+    "create_news": create_news,
+    "update_news": update_news,
+    "users_admin": users_admin,
+}
+
+# Escenarios que se miden con la caché del feed desactivada
+UNCACHED_SCENARIOS = {"public_feed_cold"}
+
+async def run_scenario(ctx: Context, scenario, concurrency: int, seconds: float, queries: QueryCounter) -> dict:
+    samples: list[float] = []
+    statuses: dict[str, int] = {}
+    errors: list[str] = []
+
+    async def worker():
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            response = await scenario(ctx)
+            samples.append(time.perf_counter() - started)
+            statuses[str(response.status_code)] = statuses.get(str(response.status_code), 0) + 1
+            if response.status_code >= 400 and response.status_code != 404 and len(errors) < 5:
+                errors.append(f"{response.status_code} {response.text[:200]}")
+
+    queries_before = queries.count
+    started = time.perf_counter()
+    deadline = started + seconds
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {
+        "requests": len(samples),
+        "throughput_rps": round(len(samples) / elapsed, 1),
+        **latency_summary(samples),
+        "queries_per_request": round((queries.count - queries_before) / len(samples), 2) if samples else 0.0,
+        "statuses": statuses,
+        "errors": errors,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+async def collect_cursors(ctx: Context, pages: int = 50) -> None:
+    url = "/api/news/public/?limit=20&fields=summary"
+    for _ in range(pages):
+        response = await ctx.client.get(url)
+        cursor = response.headers.get("x-next-cursor")
+        if not cursor:
+            break
+        ctx.cursors.append(cursor)
+        url = f"/api/news/public/?limit=20&fields=summary&cursor={cursor}"
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()
+    except Exception:
+        return "unknown"
+
+async def main_async(args, authors: list) -> dict:
+    install_fake_storage()
+    queries = QueryCounter()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        login_response = await client.post("/auth/login", data={"username": "bench0@example.com", "password": BENCH_PASSWORD})
+        ctx = Context(client, authors, args.news, login_response.json()["access_token"])
+        await collect_cursors(ctx)
+
+        results = {}
+        for name in args.scenarios:
+            cache_size = public_feed_cache.maxsize
+            if name in UNCACHED_SCENARIOS:
+                public_feed_cache.clear()
+                public_feed_cache.maxsize = 0
+            try:
+                # Calentamiento corto: cachés, pools de procesos y conexiones
+                await run_scenario(ctx, SCENARIOS[name], min(args.concurrency, 4), args.warmup, queries)
+                results[name] = await run_scenario(ctx, SCENARIOS[name], args.concurrency, args.seconds, queries)
+            finally:
+                public_feed_cache.maxsize = cache_size
+            print(f"{name}: {results[name]['throughput_rps']} req/s, p95 {results[name]['p95_ms']} ms", file=sys.stderr)
+        return results
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--news", type=int, default=1000, help="noticias a cargar (p. ej. 1000, 10000, 100000)")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=5.0, help="duración de cada escenario")
+    parser.add_argument("--warmup", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=1234, help="semilla de random (ids y términos)")
+    parser.add_argument("--scenarios", nargs="+", choices=sorted(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--output", help="fichero JSON de salida (por defecto, stdout)")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    seed_started = time.perf_counter()
+    authors = seed(args.news, args.users)
+    seed_seconds = time.perf_counter() - seed_started
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "news": args.news,
+            "users": args.users,
+            "concurrency": args.concurrency,
+            "seconds": args.seconds,
+            "random_seed": args.seed,
+            "seed_seconds": round(seed_seconds, 2),
+        },
+        "scenarios": asyncio.run(main_async(args, authors)),
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+if __name__ == "__main__":
+    main()
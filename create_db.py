@@ -1,4 +1,161 @@
-from app.database import Base, engine
-from app.models.news import News
+"""
+Crea y actualiza el esquema de la base de datos. La aplicación ya no lo
+hace al arrancar: este paso se ejecuta de forma explícita en cada
+despliegue (ver Dockerfile) y es idempotente.
 
-Base.metadata.create_all(bind=engine)
\ No newline at end of file
+Uso:
+    python create_db.py             # crear tablas, columnas e índices que falten
+    python create_db.py --check     # solo informar de lo que falta (sale con 1 si algo falta)
+    python create_db.py --reindex   # reconstruir por completo el índice de búsqueda
+    python create_db.py --rebuild-authors  # regenerar la copia del autor en news
+"""
+from sqlalchemy import func, inspect, or_, select, text
+from app.database import Base, engine, SessionLocal
+from app.models.user import User
+from app.models.news import News, make_excerpt
+from app.models.job import Job  # noqa: F401
+from app.models.cache_event import CacheEvent  # noqa: F401
+from app.core.search import ensure_search_schema, rebuild_search_index
+from datetime import datetime
+import argparse
+import sys
+
+# Sustituido por ux_news_import_key: no debe limitar las noticias de la API
+OBSOLETE_INDEXES = ("ux_news_title_date",)
+
+def pending_changes() -> list[str]:
+    """Tablas, columnas e índices del modelo que aún no existen"""
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    pending = [f"tabla {table.name}" for table in Base.metadata.sorted_tables if table.name not in existing_tables]
+    if News.__tablename__ in existing_tables:
+        existing_columns = {column["name"] for column in inspector.get_columns(News.__tablename__)}
+        pending += [
+            f"columna {News.__tablename__}.{column.name}"
+            for column in News.__table__.columns if column.name not in existing_columns
+        ]
+        existing_indexes = {index["name"] for index in inspector.get_indexes(News.__tablename__)}
+        pending += [f"índice {index.name}" for index in News.__table__.indexes if index.name not in existing_indexes]
+        pending += [f"borrar el índice {name}" for name in OBSOLETE_INDEXES if name in existing_indexes]
+        db = SessionLocal()
+        try:
+            undated = db.query(func.count(News.id)).filter(News.date.is_(None)).scalar()
+        finally:
+            db.close()
+        if undated:
+            pending.append(f"fecha en {undated} noticias")
+    return pending
+
+def create_schema() -> None:
+    Base.metadata.create_all(bind=engine)
+
+    # create_all no modifica tablas existentes: añadir columnas nuevas que falten
+    inspector = inspect(engine)
+    existing_columns = {column["name"] for column in inspector.get_columns(News.__tablename__)}
+    with engine.begin() as conn:
+        for column in News.__table__.columns:
+            if column.name not in existing_columns:
+                column_type = column.type.compile(dialect=engine.dialect)
+                conn.execute(text(f"ALTER TABLE {News.__tablename__} ADD COLUMN {column.name} {column_type}"))
+
+    # ...y crear los índices que falten
+    existing_indexes = {index["name"] for index in inspector.get_indexes(News.__tablename__)}
+    for index in News.__table__.indexes:
+        if index.name not in existing_indexes:
+            index.create(bind=engine)
+    # Índices que ya no están en el modelo
+    with engine.begin() as conn:
+        for name in OBSOLETE_INDEXES:
+            if name in existing_indexes:
+                conn.execute(text(f"DROP INDEX {name}"))
+
+    # Índice de búsqueda (tsvector + GIN en PostgreSQL, FTS5 en SQLite)
+    ensure_search_schema(engine)
+
+def stale_author_rows(db) -> int:
+    """Noticias cuya copia del autor (author_*) no coincide con users"""
+    return db.query(func.count(News.id))\
+        .outerjoin(User, News.user_id == User.id)\
+        .filter(or_(
+            News.author_first_name.is_distinct_from(User.first_name),
+            News.author_last_name.is_distinct_from(User.last_name),
+            News.author_email.is_distinct_from(User.email),
+        ))\
+        .scalar()
+
+def rebuild_author_columns(db, only_missing: bool = False) -> int:
+    """Regenera author_* desde users (todas las filas o solo las que faltan)"""
+    values = {
+        getattr(News, f"author_{column}"): select(getattr(User, column))
+            .where(User.id == News.user_id)
+            .scalar_subquery()
+        for column in ("first_name", "last_name", "email")
+    }
+    # Sin esto onupdate fijaría updated_at a ahora y cambiarían todos los ETag
+    values[News.updated_at] = News.updated_at
+    query = db.query(News)
+    if only_missing:
+        query = query.filter(News.user_id.isnot(None), News.author_email.is_(None))
+    return query.update(values, synchronize_session=False)
+
+def backfill(reindex: bool = False) -> None:
+    # Rellenar el extracto de las noticias anteriores a la columna...
+    db = SessionLocal()
+    try:
+        for news in db.query(News).filter(News.excerpt.is_(None)).yield_per(500):
+            news.excerpt = make_excerpt(news.body)
+        # ...la fecha, que es la clave de la paginación por cursor (date, id)...
+        db.query(News).filter(News.date.is_(None)).update(
+            {News.date: func.coalesce(News.updated_at, datetime.now()), News.updated_at: News.updated_at},
+            synchronize_session=False
+        )
+        if engine.dialect.name == "postgresql":
+            # SQLite no permite cambiarlo en una tabla existente: lo garantiza el modelo
+            db.execute(text(f"ALTER TABLE {News.__tablename__} ALTER COLUMN date SET NOT NULL"))
+        # ...y updated_at (usado en ETag / Last-Modified)
+        db.query(News).filter(News.updated_at.is_(None)).update(
+            {News.updated_at: News.date}, synchronize_session=False
+        )
+        # ...y la copia del autor (feed público sin JOIN con users)
+        rebuild_author_columns(db, only_missing=True)
+        # ...e indexar las que aún no están en el índice de búsqueda
+        rebuild_search_index(db, only_missing=not reindex)
+        db.commit()
+    finally:
+        db.close()
+
+def migrate(reindex: bool = False) -> None:
+    create_schema()
+    backfill(reindex)
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--check", action="store_true", help="no modificar nada, solo informar")
+    parser.add_argument("--reindex", action="store_true", help="reconstruir el índice de búsqueda completo")
+    parser.add_argument("--rebuild-authors", action="store_true", help="regenerar author_* de todas las noticias")
+    args = parser.parse_args(argv)
+
+    if args.check:
+        pending = pending_changes()
+        for change in pending:
+            print(f"Falta {change}")
+        print("Esquema al día" if not pending else f"{len(pending)} cambios pendientes")
+        return 1 if pending else 0
+
+    migrate(reindex=args.reindex)
+    print("Esquema actualizado")
+
+    if args.rebuild_authors:
+        db = SessionLocal()
+        try:
+            stale = stale_author_rows(db)
+            rebuilt = rebuild_author_columns(db)
+            db.commit()
+        finally:
+            db.close()
+        # Si había diferencias, algún camino de escritura no mantiene la copia
+        print(f"Autor regenerado en {rebuilt} noticias ({stale} desactualizadas)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,50 @@
+"""
+Entorno de pruebas: SQLite en un directorio temporal, sin red ni Supabase.
+Las variables se fijan antes de importar la aplicación (app.database crea
+el engine al importarse), igual que en benchmarks/common.py.
+"""
+import os
+import sys
+import tempfile
+
+_tmpdir = tempfile.mkdtemp(prefix="rmm-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_tmpdir}/tests.db"
+os.environ.setdefault("SUPABASE_URL", "http://127.0.0.1:54321")
+os.environ.setdefault("SUPABASE_SERVICE_ROLE", "tests")
+os.environ.setdefault("SECRET_KEY", "tests")
+os.environ.setdefault("STORAGE_BACKEND", "local")
+os.environ.setdefault("LOCAL_STORAGE_PATH", os.path.join(_tmpdir, "media"))
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import pytest
+from sqlalchemy import text
+from app.database import Base, SessionLocal, engine
+from app.core.cache import news_item_cache, public_feed_cache
+from app.core.security import principal_cache
+import create_db
+
+@pytest.fixture(scope="session", autouse=True)
+def schema():
+    create_db.migrate()
+    yield
+
+@pytest.fixture(autouse=True)
+def clean_db():
+    """Cada prueba empieza con las tablas y las cachés vacías"""
+    yield
+    with engine.begin() as conn:
+        for table in reversed(Base.metadata.sorted_tables):
+            conn.execute(table.delete())
+        conn.execute(text("DELETE FROM news_fts"))
+    for cache in (public_feed_cache, news_item_cache, principal_cache):
+        cache.clear()
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
@@ -0,0 +1,67 @@
+import time
+import pytest
+from app.core import invalidation
+from app.core.invalidation import InvalidationListener, invalidation_handler
+from app.models.cache_event import CacheEvent
+
+TEST_ENTITY = "test"
+applied: list = []
+
+@invalidation_handler(TEST_ENTITY)
+def _record(entity_id):
+    applied.append(entity_id)
+
+@pytest.fixture(autouse=True)
+def reset_applied():
+    applied.clear()
+
+def _event(db, event_id: int, entity_id: str, published_at: float = None):
+    db.add(CacheEvent(
+        id=event_id, entity=TEST_ENTITY, entity_id=entity_id, origin="other-worker",
+        version=event_id, published_at=published_at or time.time(),
+    ))
+    db.commit()
+
+def test_poll_applies_new_events_once(db):
+    listener = InvalidationListener()
+    listener.poll_once()
+
+    _event(db, 1, "a")
+    _event(db, 2, "b")
+    assert listener.poll_once() == 2
+    assert listener.poll_once() == 0
+    assert applied == ["a", "b"]
+
+def test_poll_applies_event_committed_out_of_id_order(db):
+    listener = InvalidationListener()
+    listener.poll_once()
+
+    # La transacción con id 11 confirma antes que la de id 10
+    _event(db, 11, "late-id")
+    assert listener.poll_once() == 1
+    _event(db, 10, "early-id")
+
+    assert listener.poll_once() == 1
+    assert sorted(applied) == ["early-id", "late-id"]
+
+def test_events_outside_the_reorder_window_below_high_water_are_ignored(db, monkeypatch):
+    monkeypatch.setattr(invalidation, "INVALIDATION_REORDER_WINDOW", 5)
+    listener = InvalidationListener()
+    listener.poll_once()
+    _event(db, 21, "new")
+    listener.poll_once()
+
+    _event(db, 20, "ancient", published_at=time.time() - 60)
+
+    assert listener.poll_once() == 0
+    assert applied == ["new"]
+
+def test_own_events_are_not_reapplied(db):
+    listener = InvalidationListener()
+    listener.poll_once()
+    db.add(CacheEvent(id=30, entity=TEST_ENTITY, entity_id="mine", origin=invalidation.WORKER_ID,
+                      version=1, published_at=time.time()))
+    db.commit()
+
+    listener.poll_once()
+    assert applied == []
@@ -0,0 +1,43 @@
+from datetime import datetime, timedelta, timezone
+import pytest
+from app.core.jobs import bucket_path, find_orphans, referenced_paths
+from app.models.news import News
+
+@pytest.mark.parametrize("url", [
+    "https://old.supabase.co/storage/v1/object/public/newsimages/news/a.png",
+    "https://cdn.example.org/storage/v1/object/public/newsimages/news/a.png",
+    "/media/news/a.png",
+    "https://example.org/media/news/a.png?v=2",
+])
+def test_bucket_path_ignores_host_and_base(url):
+    assert bucket_path(url) == "news/a.png"
+
+def test_bucket_path_variants_and_bucket_named_like_prefix():
+    assert bucket_path("/media/news/variants/a/w640.webp") == "news/variants/a/w640.webp"
+    assert bucket_path("https://x.supabase.co/storage/v1/object/public/news/news/a.png") == "news/a.png"
+
+@pytest.mark.parametrize("url", [None, "", "https://example.org/other/a.png", "https://example.org/news"])
+def test_bucket_path_rejects_foreign_urls(url):
+    assert bucket_path(url) is None
+
+def test_referenced_paths_survive_a_base_url_change(db):
+    db.add(News(
+        title="con imagen", date=datetime(2024, 1, 1),
+        image_url="https://old-project.supabase.co/storage/v1/object/public/newsimages/news/a.png",
+        image_variants=[{"width": 640, "format": "webp", "url": "/media/news/variants/a/w640.webp"}],
+    ))
+    db.commit()
+
+    assert referenced_paths() == {"news/a.png", "news/variants/a/w640.webp"}
+
+def test_find_orphans_respects_references_grace_and_missing_dates():
+    now = datetime.now(timezone.utc)
+    old = now - timedelta(days=2)
+    objects = [
+        ("news/used.png", old),
+        ("news/orphan.png", old),
+        ("news/recent.png", now),
+        ("news/undated.png", None),
+    ]
+
+    assert find_orphans(objects, {"news/used.png"}, now - timedelta(hours=1)) == ["news/orphan.png"]
@@ -0,0 +1,48 @@
+from datetime import datetime, timedelta
+import pytest
+from fastapi import HTTPException
+from app.core.pagination import apply_keyset, decode_cursor, encode_cursor, split_page
+from app.models.news import News
+
+def test_cursor_round_trip():
+    date = datetime(2024, 5, 1, 12, 30, 15, 123456)
+    assert decode_cursor(encode_cursor(date, 42)) == (date, 42)
+
+@pytest.mark.parametrize("cursor", ["e30", "no-es-base64!", encode_cursor(datetime(2024, 1, 1), 1)[:-4]])
+def test_invalid_cursor_is_400(cursor):
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(cursor)
+    assert error.value.status_code == 400
+
+def _pages(db, limit):
+    cursor, pages = None, []
+    while True:
+        rows = apply_keyset(db.query(News), News, cursor).limit(limit + 1).all()
+        page, cursor = split_page(rows, limit)
+        pages.append([news.id for news in page])
+        if cursor is None:
+            return pages
+
+@pytest.mark.parametrize("limit", [1, 3, 4, 10])
+def test_pages_cover_every_row_once_in_order(db, limit):
+    start = datetime(2024, 1, 1)
+    # Fechas repetidas: el id desempata también entre páginas
+    for i in range(10):
+        db.add(News(title=f"n{i}", date=start + timedelta(days=i // 3)))
+    db.commit()
+    expected = [news.id for news in db.query(News).order_by(News.date.desc(), News.id.desc())]
+
+    pages = _pages(db, limit)
+
+    assert [news_id for page in pages for news_id in page] == expected
+    assert all(len(page) == limit for page in pages[:-1])
+    assert 0 < len(pages[-1]) <= limit
+
+def test_exact_multiple_has_no_trailing_cursor(db):
+    for i in range(4):
+        db.add(News(title=f"n{i}", date=datetime(2024, 1, 1) + timedelta(hours=i)))
+    db.commit()
+    rows = apply_keyset(db.query(News), News, None).limit(5).all()
+    page, cursor = split_page(rows, 4)
+    assert len(page) == 4
+    assert cursor is None
@@ -0,0 +1,40 @@
+import uuid
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.core.security import create_access_token, principal_cache
+from app.models.user import User
+
+@pytest.fixture
+def client():
+    # Sin lifespan: no hace falta el bucle de trabajos ni el bus de invalidación
+    return TestClient(app)
+
+def _user(db, email, role="user"):
+    user = User(id=uuid.uuid4(), email=email, first_name="Test", last_name="User",
+                hashed_password="x", role=role, is_active=True)
+    db.add(user)
+    db.commit()
+    token = create_access_token({"sub": email, "scopes": ["admin", "user"] if role == "admin" else ["user"], "role": role})
+    return user, {"Authorization": f"Bearer {token}"}
+
+def test_deactivated_user_is_rejected_immediately(db, client):
+    admin, admin_headers = _user(db, "admin@example.com", role="admin")
+    user, user_headers = _user(db, "user@example.com")
+
+    assert client.get(f"/users/{user.id}", headers=user_headers).status_code == 200
+    assert len(principal_cache) >= 1
+
+    response = client.put(f"/users/{user.id}", json={"is_active": False}, headers=admin_headers)
+    assert response.status_code == 200
+
+    # La entrada en caché ya no vale, aunque su TTL no haya vencido
+    assert client.get(f"/users/{user.id}", headers=user_headers).status_code == 400
+
+def test_demoted_admin_loses_admin_routes(db, client):
+    admin, admin_headers = _user(db, "admin@example.com", role="admin")
+    other, other_headers = _user(db, "other@example.com", role="admin")
+
+    assert client.get("/internal/cache", headers=other_headers).status_code == 200
+    assert client.put(f"/users/{other.id}", json={"role": "user"}, headers=admin_headers).status_code == 200
+    assert client.get("/internal/cache", headers=other_headers).status_code == 403
@@ -0,0 +1,57 @@
+import io
+from datetime import datetime
+import orjson
+from app.core.transfer import export_ndjson, import_ndjson
+from app.models.news import News
+
+def _ndjson(*rows) -> bytes:
+    return b"".join(orjson.dumps(row) + b"\n" for row in rows)
+
+def _import(data: bytes, on_conflict: str = "skip") -> dict:
+    lines = list(import_ndjson(io.BytesIO(data), on_conflict))
+    return orjson.loads(lines[-1])
+
+NEWS = [
+    {"title": "Uno", "date": "2024-01-01T10:00:00", "body": "primero"},
+    {"title": "Dos", "date": "2024-01-02T10:00:00", "body": "segundo"},
+]
+
+def test_repeated_import_skips_existing(db):
+    first = _import(_ndjson(*NEWS))
+    second = _import(_ndjson(*NEWS))
+
+    assert (first["inserted"], first["skipped"], first["done"]) == (2, 0, True)
+    assert (second["inserted"], second["skipped"], second["done"]) == (0, 2, True)
+    assert db.query(News).count() == 2
+
+def test_update_mode_rewrites_in_place(db):
+    _import(_ndjson(*NEWS))
+    changed = [{**NEWS[0], "body": "editado"}, NEWS[1]]
+
+    stats = _import(_ndjson(*changed), "update")
+
+    assert (stats["inserted"], stats["updated"]) == (0, 2)
+    assert db.query(News).count() == 2
+    assert db.query(News.body).filter(News.title == "Uno").scalar() == "editado"
+
+def test_last_duplicate_in_a_batch_wins(db):
+    stats = _import(_ndjson(NEWS[0], {**NEWS[0], "body": "último"}))
+
+    assert (stats["inserted"], stats["skipped"]) == (1, 1)
+    assert db.query(News.body).scalar() == "último"
+
+def test_reimporting_an_export_adopts_news_created_elsewhere(db):
+    # Creada desde la API: sin import_key
+    db.add(News(title="API", date=datetime(2024, 3, 1), body="x"))
+    db.commit()
+    exported = b"".join(export_ndjson())
+
+    stats = _import(exported)
+
+    assert (stats["inserted"], stats["skipped"]) == (0, 1)
+    assert db.query(News).count() == 1
+
+def test_invalid_lines_are_reported_not_imported(db):
+    stats = _import(b'{"title": "sin fecha"}\nno es json\n' + _ndjson(NEWS[0]))
+
+    assert (stats["inserted"], stats["errors"]) == (1, 2)